@@ -1,12 +1,80 @@
 from BlazeFaceDetector import BlazeFaceDetector
+from BlazeFaceUtils import MemoryBudget
 import gc
 import math
+import sensor
+import time
+
+# Operating modes of the power-save scheduler (see enable_power_save()).
+MODE_ACTIVE = "active"
+MODE_IDLE = "idle"
 
 class AI_FaceDetection:
-    def __init__(self):
+    # Set profile_memory=True to record heap usage of every pipeline stage
+    # (see memory_report()). This adds a gc.collect() before each stage.
+    def __init__(self, profile_memory=False):
+        self.memory = MemoryBudget() if profile_memory else None
         self.detector = BlazeFaceDetector(model_path="face_detection_front",
                                           score_threshold=0.7,
-                                          iou_threshold=0.3)
+                                          iou_threshold=0.3,
+                                          memory=self.memory)
+
+        # Power-save scheduler state, off until enable_power_save() is called.
+        self.mode = MODE_ACTIVE
+        self.power_save = False
+        self.idle_after_ms = 0
+        self.idle_interval_ms = 0
+        self.idle_framesize = None
+        self.active_framesize = None
+        self.last_face_time = time.ticks_ms()
+        self.last_frame_time = self.last_face_time
+
+    # Switch to MODE_IDLE after idle_after_ms without a face: frames are paced to
+    # one every idle_interval_ms and, if given, the sensor drops to idle_framesize
+    # (e.g. sensor.B64X64). The first detection returns to MODE_ACTIVE and
+    # active_framesize (default: the framesize at the time of this call)
+    # straight away. Capture frames with self.snapshot().
+    def enable_power_save(self, idle_after_ms=5000, idle_interval_ms=500,
+                          idle_framesize=None, active_framesize=None):
+        self.power_save = True
+        self.idle_after_ms = idle_after_ms
+        self.idle_interval_ms = idle_interval_ms
+        self.idle_framesize = idle_framesize
+        # Without an explicit active_framesize, return to the current one.
+        if idle_framesize is not None and active_framesize is None:
+            active_framesize = sensor.get_framesize()
+        self.active_framesize = active_framesize
+        self.last_face_time = time.ticks_ms()
+
+    def disable_power_save(self):
+        self.set_mode(MODE_ACTIVE)
+        self.power_save = False
+
+    def set_mode(self, mode):
+        if mode == self.mode:
+            return
+        self.mode = mode
+        framesize = self.idle_framesize if mode == MODE_IDLE else self.active_framesize
+        if framesize is not None:
+            sensor.set_framesize(framesize)
+
+    # Capture a frame, sleeping first if needed to keep the idle frame rate.
+    # Use in place of sensor.snapshot() when power save is enabled.
+    def snapshot(self):
+        if self.mode == MODE_IDLE:
+            wait = self.idle_interval_ms - time.ticks_diff(time.ticks_ms(), self.last_frame_time)
+            if wait > 0:
+                time.sleep_ms(wait)
+        self.last_frame_time = time.ticks_ms()
+        return sensor.snapshot()
+
+    def update_mode(self, face_found):
+        now = time.ticks_ms()
+        if face_found:
+            self.last_face_time = now
+            self.set_mode(MODE_ACTIVE)
+        elif self.mode == MODE_ACTIVE and time.ticks_diff(now, self.last_face_time) > self.idle_after_ms:
+            self.set_mode(MODE_IDLE)
 
     # Function expects RGB 128x128 image but will resize if necessary
     def detect_faces(self, img):
@@ -25,6 +93,8 @@ class AI_FaceDetection:
         detections = self.detector.detect_faces(img)
         gc.collect()
 
+        if self.memory is not None:
+            self.memory.start("results")
         final_detections = []
 
         for det in detections[0]:
@@ -73,8 +143,19 @@ class AI_FaceDetection:
                 "right_ear": (right_ear_x, right_ear_y),
             })
 
+        if self.memory is not None:
+            self.memory.stop("results")
+        if self.power_save:
+            self.update_mode(len(final_detections) > 0)
         return final_detections
 
+    # Print the per-stage heap usage table (requires profile_memory=True).
+    def memory_report(self):
+        if self.memory is None:
+            print("Memory profiling is disabled, use AI_FaceDetection(profile_memory=True)")
+            return
+        self.memory.report()
+
     def angle_relative_to_camera(self, detection, hfov=70.8, vfov=55.6):
         cx = self.orig_width / 2.0
         cy = self.orig_height / 2.0
@@ -1,31 +1,62 @@
-import time, ml, math
+import time, math
+from array import array
 from BlazeFaceUtils import SsdAnchorsCalculatorOptions, gen_anchors
 
+try:
+    import ml
+except ImportError:
+    # Host (CPython) use, e.g. tools/evaluate_thresholds.py: only the
+    # post-processing (decode_detections / non_max_suppression) is available.
+    ml = None
+
+try:
+    from time import ticks_ms, ticks_diff
+except ImportError:
+    def ticks_ms():
+        return int(time.monotonic() * 1000)
+
+    def ticks_diff(a, b):
+        return a - b
+
 # Constants
 KEY_POINT_SIZE = 6      # Number of facial keypoints per detection.
 MAX_FACE_NUM = 8      # Maximum number of faces to keep after NMS.
+BOX_STRIDE = 5        # Floats per candidate in the NMS box table: x1, y1, x2, y2, area.
 
 #------------------------------------------------------------------------------
 # BlazeFace Detector class using the ml module
 #------------------------------------------------------------------------------
 class BlazeFaceDetector:
     def __init__(self, model_path,
-                 score_threshold=0.7, iou_threshold=0.3):
+                 score_threshold=0.7, iou_threshold=0.3, memory=None):
         self.score_threshold = score_threshold  # Detection probability threshold.
         self.iou_threshold = iou_threshold      # IoU threshold for non-max suppression.
         self.fps = 0
-        self.last_time = time.ticks_ms()
+        self.last_time = ticks_ms()
         self.frame_counter = 0
+        # Optional MemoryBudget recording heap usage of each pipeline stage.
+        self.memory = memory
 
         # Define the model input dimensions.
         self.input_width = 128
         self.input_height = 128
 
         # Load the TFLite model using the ml module.
-        self.model = ml.Model(model_path)
+        # model_path=None skips loading, leaving only the post-processing usable.
+        self.model = None
+        if model_path is not None:
+            if memory is not None:
+                memory.start("model_load")
+            self.model = ml.Model(model_path)
+            if memory is not None:
+                memory.stop("model_load")
 
         # Generate anchors for the 896 detections.
+        if memory is not None:
+            memory.start("anchors")
         self.anchors = self.generateAnchors()
+        if memory is not None:
+            memory.stop("anchors")
 
     #------------------------------------------------------------------------------
     # Generate anchors similar to the original BlazeFace implementation.
@@ -135,19 +166,72 @@ class BlazeFaceDetector:
         union_area = area1 + area2 - inter_area
         return inter_area / union_area
 
+    #------------------------------------------------------------------------------
+    # Pack detections into a flat float array of (x1, y1, x2, y2, area) per
+    # detection, so corners and areas are computed once for the whole NMS pass.
+    #------------------------------------------------------------------------------
+    def box_table(self, detections):
+        # Preallocated (zero-filled) so the buffer is not regrown box by box.
+        table = array('f', bytes(4 * BOX_STRIDE * len(detections)))
+        k = 0
+        for det in detections:
+            x, y, w, h = det[0], det[1], det[2], det[3]
+            table[k] = x
+            table[k + 1] = y
+            table[k + 2] = x + w
+            table[k + 3] = y + h
+            table[k + 4] = w * h
+            k += BOX_STRIDE
+        return table
+
+    #------------------------------------------------------------------------------
+    # Compute IoU of box i against boxes start..end-1 of a box table in one call.
+    # Results are written to out[start..end-1]. Boxes flagged in the optional
+    # suppressed bytearray are skipped (their result is 0.0).
+    #------------------------------------------------------------------------------
+    def iou_many(self, table, i, start, end, out, suppressed=None):
+        k = i * BOX_STRIDE
+        ax1 = table[k]
+        ay1 = table[k + 1]
+        ax2 = table[k + 2]
+        ay2 = table[k + 3]
+        area = table[k + 4]
+        k = start * BOX_STRIDE
+        for j in range(start, end):
+            if suppressed is not None and suppressed[j]:
+                out[j] = 0.0
+                k += BOX_STRIDE
+                continue
+            inter_w = min(ax2, table[k + 2]) - max(ax1, table[k])
+            inter_h = min(ay2, table[k + 3]) - max(ay1, table[k + 1])
+            if inter_w <= 0 or inter_h <= 0:
+                out[j] = 0.0
+            else:
+                inter_area = inter_w * inter_h
+                out[j] = inter_area / (area + table[k + 4] - inter_area)
+            k += BOX_STRIDE
+
     #------------------------------------------------------------------------------
     # Apply non-max suppression to reduce overlapping detections.
     #------------------------------------------------------------------------------
     def non_max_suppression(self, detections):
         # Sort detections by score (highest first).
         detections = sorted(detections, key=lambda d: d[4], reverse=True)
+        num = len(detections)
+        table = self.box_table(detections)
+        overlaps = array('f', [0.0] * num)
+        suppressed = bytearray(num)
         final_detections = []
-        while detections:
-            best = detections.pop(0)
-            final_detections.append(best)
-            detections = [d for d in detections if self.iou(best, d) < self.iou_threshold]
+        for i in range(num):
+            if suppressed[i]:
+                continue
+            final_detections.append(detections[i])
             if len(final_detections) >= MAX_FACE_NUM:
                 break
+            self.iou_many(table, i, i + 1, num, overlaps, suppressed)
+            for j in range(i + 1, num):
+                if overlaps[j] >= self.iou_threshold:
+                    suppressed[j] = 1
         return final_detections
 
     #------------------------------------------------------------------------------
@@ -155,8 +239,8 @@ class BlazeFaceDetector:
     #------------------------------------------------------------------------------
     def update_fps(self):
         self.frame_counter += 1
-        current_time = time.ticks_ms()
-        dt = time.ticks_diff(current_time, self.last_time)
+        current_time = ticks_ms()
+        dt = ticks_diff(current_time, self.last_time)
         if dt > 0:
             self.fps = 1000 // dt
         self.last_time = current_time
@@ -176,19 +260,37 @@ class BlazeFaceDetector:
         orig_w = img.width()
         orig_h = img.height()
 
+        memory = self.memory
+
         # Prepare the image for inference.
+        if memory is not None:
+            memory.start("preprocess")
         inp = self.prepare_input(img)
+        if memory is not None:
+            memory.stop("preprocess")
         # Run inference. predict() requires a list of inputs.
+        if memory is not None:
+            memory.start("inference")
         outputs = self.model.predict([inp])
+        if memory is not None:
+            memory.stop("inference")
         # According to our model, outputs[0] is the scores tensor (shape: (1,896,1))
         # and outputs[1] is the boxes tensor (shape: (1,896,16)).
         scores = outputs[0][0]  # Remove the batch dimension → shape (896, 1)
         boxes = outputs[1][0]   # Remove the batch dimension → shape (896, 16)
 
         # Decode raw outputs into detection candidates.
+        if memory is not None:
+            memory.start("decode")
         detections = self.decode_detections(boxes, scores)
+        if memory is not None:
+            memory.stop("decode")
         # Apply non-max suppression to remove overlapping detections.
+        if memory is not None:
+            memory.start("nms")
         final_detections = self.non_max_suppression(detections)
+        if memory is not None:
+            memory.stop("nms")
         self.update_fps()
         return final_detections, orig_w, orig_h
 
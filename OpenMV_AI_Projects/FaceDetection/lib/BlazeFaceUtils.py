@@ -1,3 +1,4 @@
+import gc
 import math
 
 class SsdAnchorsCalculatorOptions:
@@ -119,3 +120,50 @@ def gen_anchors(options):
                     anchors.append(new_anchor)
         layer_id = last_same_stride_layer
     return anchors
+
+#------------------------------------------------------------------------------
+# Heap usage recorder for the detection pipeline.
+# Each stage is bracketed with start()/stop(); the delta of gc.mem_alloc()
+# between the two calls is what the stage left allocated on the heap, and
+# gc.mem_free() after the stage is the headroom that remained.
+#------------------------------------------------------------------------------
+class MemoryBudget:
+    def __init__(self, collect=True):
+        # Collect before each stage so the deltas are not skewed by garbage
+        # left over from the previous stage.
+        self.collect = collect
+        self.stages = []    # Stage names in the order they were first seen.
+        self.records = {}   # name -> [calls, last_delta, peak_delta, min_free]
+        self._starts = {}
+
+    def start(self, name):
+        if self.collect:
+            gc.collect()
+        self._starts[name] = gc.mem_alloc()
+
+    def stop(self, name):
+        delta = gc.mem_alloc() - self._starts.pop(name)
+        free = gc.mem_free()
+        record = self.records.get(name)
+        if record is None:
+            self.stages.append(name)
+            self.records[name] = [1, delta, delta, free]
+            return
+        record[0] += 1
+        record[1] = delta
+        if delta > record[2]:
+            record[2] = delta
+        if free < record[3]:
+            record[3] = free
+
+    def reset(self):
+        self.stages = []
+        self.records = {}
+        self._starts = {}
+
+    def report(self):
+        print("{:<12}{:>7}{:>10}{:>10}{:>10}".format("stage", "calls", "last", "peak", "min_free"))
+        for name in self.stages:
+            calls, last, peak, min_free = self.records[name]
+            print("{:<12}{:>7}{:>10}{:>10}{:>10}".format(name, calls, last, peak, min_free))
+        print("heap: {} bytes allocated, {} bytes free".format(gc.mem_alloc(), gc.mem_free()))
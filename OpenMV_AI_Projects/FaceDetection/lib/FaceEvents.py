@@ -0,0 +1,102 @@
+# Face detection events
+# Turns the detections returned by AI_FaceDetection.detect_faces() into
+# enter / exit / move callbacks, so application code only runs on changes.
+
+class TrackedFace:
+    def __init__(self, face_id, detection, cx, cy):
+        self.id = face_id
+        self.detection = detection
+        # Current center of the bounding box.
+        self.cx = cx
+        self.cy = cy
+        # Center at the last on_enter / on_move callback.
+        self.reported_x = cx
+        self.reported_y = cy
+        # Consecutive frames this face was not found in.
+        self.missed = 0
+
+#------------------------------------------------------------------------------
+# Face event tracker.
+# Faces are matched between frames by the distance between bounding box
+# centers (in pixels). Callbacks:
+#   on_enter(face_id, detection)         - a new face appeared
+#   on_exit(face_id, detection)          - a face was missing for exit_frames
+#                                          frames (detection is the last seen)
+#   on_move(face_id, detection, dx, dy)  - a face moved more than
+#                                          move_threshold pixels since the
+#                                          last on_enter/on_move
+#------------------------------------------------------------------------------
+class FaceEventTracker:
+    def __init__(self, on_enter=None, on_exit=None, on_move=None,
+                 move_threshold=8, match_distance=40, exit_frames=3):
+        self.on_enter = on_enter
+        self.on_exit = on_exit
+        self.on_move = on_move
+        self.move_threshold_sq = move_threshold * move_threshold
+        self.match_distance_sq = match_distance * match_distance
+        self.exit_frames = exit_frames
+        self.faces = []
+        self.next_id = 0
+
+    # Call once per frame with the output of detect_faces().
+    def update(self, detections):
+        faces = self.faces
+        matched = [False] * len(faces)
+
+        for det in detections:
+            x, y, w, h = det["bounding_box"]
+            cx = x + w // 2
+            cy = y + h // 2
+
+            # Nearest face from the previous frames that is still unmatched.
+            best = -1
+            best_dist = self.match_distance_sq
+            for i in range(len(faces)):
+                if matched[i]:
+                    continue
+                dx = cx - faces[i].cx
+                dy = cy - faces[i].cy
+                dist = dx * dx + dy * dy
+                if dist <= best_dist:
+                    best_dist = dist
+                    best = i
+
+            if best < 0:
+                face = TrackedFace(self.next_id, det, cx, cy)
+                self.next_id += 1
+                faces.append(face)
+                matched.append(True)
+                if self.on_enter is not None:
+                    self.on_enter(face.id, det)
+                continue
+
+            matched[best] = True
+            face = faces[best]
+            face.detection = det
+            face.cx = cx
+            face.cy = cy
+            face.missed = 0
+            dx = cx - face.reported_x
+            dy = cy - face.reported_y
+            if dx * dx + dy * dy > self.move_threshold_sq:
+                face.reported_x = cx
+                face.reported_y = cy
+                if self.on_move is not None:
+                    self.on_move(face.id, det, dx, dy)
+
+        # Faces not seen this frame exit after exit_frames consecutive misses.
+        i = 0
+        while i < len(faces):
+            if not matched[i]:
+                face = faces[i]
+                face.missed += 1
+                if face.missed >= self.exit_frames:
+                    faces.pop(i)
+                    matched.pop(i)
+                    if self.on_exit is not None:
+                        self.on_exit(face.id, face.detection)
+                    continue
+            i += 1
+
+    def count(self):
+        return len(self.faces)
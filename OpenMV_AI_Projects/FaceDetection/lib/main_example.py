@@ -10,9 +10,13 @@ sensor.skip_frames(time=2000)
 
 # example of use of face detection
 detector = AI_FaceDetection()
+# Optional: drop to a low frame rate when no face has been seen for 5 seconds.
+# detector.enable_power_save(idle_after_ms=5000, idle_interval_ms=500)
 
 while True:
-    img = sensor.snapshot()
+    # detector.snapshot() behaves like sensor.snapshot() but also paces
+    # frames while the detector is idle (see enable_power_save above).
+    img = detector.snapshot()
     # Preffered input image is 128x128 RGB565 image
     # but the function will resize if necessary.
     detections = detector.detect_faces(img)
@@ -0,0 +1,244 @@
+"""
+Offline threshold evaluation for the BlazeFace post-processing.
+
+Runs BlazeFaceDetector's decode_detections / non_max_suppression on a host
+computer (no camera needed) over a folder of model outputs, for every
+combination of score_threshold and iou_threshold, and reports precision,
+recall, mAP and post-processing throughput for each one.
+
+Inputs:
+  - Precomputed model outputs: one <name>.npz per image holding the raw
+    "scores" (896, 1) and "boxes" (896, 16) tensors, or
+  - Images plus a CPU TFLite stand-in: --images DIR --model model.tflite
+    (needs Pillow and either tflite_runtime or tensorflow).
+  - Labels: a JSON file mapping <name> (file name without extension) to a
+    list of ground truth boxes [x, y, w, h], normalized to 0..1 with (x, y)
+    the top-left corner, the same convention as the detector output.
+
+Example:
+  python evaluate_thresholds.py --outputs outputs/ --labels labels.json \\
+      --score-thresholds 0.5,0.6,0.7,0.8 --iou-thresholds 0.2,0.3,0.4
+
+Dependencies: numpy (plus Pillow and tflite_runtime/tensorflow for --images)
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib"))
+from BlazeFaceDetector import BlazeFaceDetector  # noqa: E402
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+# Per-worker state, created once by init_worker().
+_detector = None
+_interpreter = None
+
+
+#------------------------------------------------------------------------------
+# Worker setup and model output loading.
+#------------------------------------------------------------------------------
+def init_worker(model_path):
+    global _detector, _interpreter
+    # model_path=None: no ml.Model is loaded, only anchors and post-processing.
+    _detector = BlazeFaceDetector(model_path=None)
+    if model_path is not None:
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            from tensorflow.lite import Interpreter
+        _interpreter = Interpreter(model_path=model_path)
+        _interpreter.allocate_tensors()
+
+
+def run_tflite(image_path):
+    from PIL import Image
+
+    inp = _interpreter.get_input_details()[0]
+    img = Image.open(image_path).convert("RGB").resize((128, 128))
+    # Same normalization as prepare_input(): pixel values mapped to [-1, 1].
+    arr = np.asarray(img, dtype=np.float32) / 127.5 - 1.0
+    if inp["dtype"] != np.float32:
+        scale, zero_point = inp["quantization"]
+        arr = np.round(arr / scale + zero_point)
+        info = np.iinfo(inp["dtype"])
+        arr = np.clip(arr, info.min, info.max)
+    _interpreter.set_tensor(inp["index"], arr[np.newaxis].astype(inp["dtype"]))
+    _interpreter.invoke()
+
+    scores = boxes = None
+    for out in _interpreter.get_output_details():
+        tensor = _interpreter.get_tensor(out["index"])[0].astype(np.float32)
+        scale, zero_point = out["quantization"]
+        if scale:
+            tensor = (tensor - zero_point) * scale
+        # Tell the outputs apart by their last dimension: 1 score, 16 box values.
+        if tensor.shape[-1] == 1:
+            scores = tensor
+        else:
+            boxes = tensor
+    return scores, boxes
+
+
+def load_outputs(path):
+    if _interpreter is not None:
+        return run_tflite(path)
+    data = np.load(path)
+    scores = data["scores"]
+    boxes = data["boxes"]
+    # Accept tensors saved with or without the batch dimension.
+    if scores.ndim == 3:
+        scores = scores[0]
+    if boxes.ndim == 3:
+        boxes = boxes[0]
+    return scores, boxes
+
+
+#------------------------------------------------------------------------------
+# Evaluate a single file for every threshold combination.
+# Returns (name, [(scored_matches, elapsed_s), ...]) where scored_matches is a
+# list of (score, is_true_positive) for each final detection.
+#------------------------------------------------------------------------------
+def match_detections(detections, ground_truth, match_iou):
+    matched = [False] * len(ground_truth)
+    scored = []
+    # non_max_suppression() already returns detections sorted by score.
+    for det in detections:
+        best_iou = match_iou
+        best_index = -1
+        for j, gt in enumerate(ground_truth):
+            if matched[j]:
+                continue
+            overlap = _detector.iou(det, gt)
+            if overlap >= best_iou:
+                best_iou = overlap
+                best_index = j
+        if best_index >= 0:
+            matched[best_index] = True
+        scored.append((det[4], best_index >= 0))
+    return scored
+
+
+def evaluate_file(job):
+    path, ground_truth, combos, match_iou = job
+    scores, boxes = load_outputs(path)
+    results = []
+    for score_threshold, iou_threshold in combos:
+        _detector.score_threshold = score_threshold
+        _detector.iou_threshold = iou_threshold
+        start = time.perf_counter()
+        detections = _detector.non_max_suppression(_detector.decode_detections(boxes, scores))
+        elapsed = time.perf_counter() - start
+        results.append((match_detections(detections, ground_truth, match_iou), elapsed))
+    return results
+
+
+#------------------------------------------------------------------------------
+# Metrics.
+#------------------------------------------------------------------------------
+def average_precision(scored, num_gt):
+    if num_gt == 0 or not scored:
+        return 0.0
+    scored = sorted(scored, key=lambda s: s[0], reverse=True)
+    tp = np.cumsum([1 if hit else 0 for _, hit in scored])
+    fp = np.cumsum([0 if hit else 1 for _, hit in scored])
+    recall = tp / num_gt
+    precision = tp / (tp + fp)
+    # All-point interpolation (PASCAL VOC 2010+): make precision monotonic,
+    # then integrate over the recall steps.
+    recall = np.concatenate(([0.0], recall, [recall[-1]]))
+    precision = np.concatenate(([0.0], precision, [0.0]))
+    for i in range(len(precision) - 2, -1, -1):
+        precision[i] = max(precision[i], precision[i + 1])
+    steps = np.where(recall[1:] != recall[:-1])[0]
+    return float(np.sum((recall[steps + 1] - recall[steps]) * precision[steps + 1]))
+
+
+def summarize(combos, file_results, num_gt):
+    rows = []
+    for k, (score_threshold, iou_threshold) in enumerate(combos):
+        scored = []
+        elapsed = 0.0
+        for results in file_results:
+            scored.extend(results[k][0])
+            elapsed += results[k][1]
+        tp = sum(1 for _, hit in scored if hit)
+        precision = tp / len(scored) if scored else 0.0
+        recall = tp / num_gt if num_gt else 0.0
+        # Single "face" class, so mAP is the AP of that class.
+        rows.append((score_threshold, iou_threshold, precision, recall,
+                     average_precision(scored, num_gt),
+                     len(file_results) / elapsed if elapsed > 0 else 0.0))
+    return rows
+
+
+def print_table(rows):
+    print("{:>7}{:>7}{:>11}{:>9}{:>8}{:>12}".format(
+        "score", "iou", "precision", "recall", "mAP", "files/s"))
+    for row in rows:
+        print("{:>7.2f}{:>7.2f}{:>11.3f}{:>9.3f}{:>8.3f}{:>12.1f}".format(*row))
+
+
+#------------------------------------------------------------------------------
+# Entry point.
+#------------------------------------------------------------------------------
+def parse_thresholds(text):
+    return [float(value) for value in text.split(",") if value]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--outputs", help="folder of <name>.npz raw model outputs")
+    source.add_argument("--images", help="folder of images, run through --model")
+    parser.add_argument("--model", help="TFLite model used with --images")
+    parser.add_argument("--labels", required=True, help="JSON file of ground truth boxes")
+    parser.add_argument("--score-thresholds", type=parse_thresholds, default=[0.5, 0.6, 0.7, 0.8])
+    parser.add_argument("--iou-thresholds", type=parse_thresholds, default=[0.2, 0.3, 0.4, 0.5])
+    parser.add_argument("--match-iou", type=float, default=0.5,
+                        help="IoU needed for a detection to count as a true positive")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    if args.images and not args.model:
+        parser.error("--images needs --model")
+
+    with open(args.labels) as f:
+        labels = json.load(f)
+
+    folder = args.outputs or args.images
+    extensions = (".npz",) if args.outputs else IMAGE_EXTENSIONS
+    files = sorted(name for name in os.listdir(folder) if name.lower().endswith(extensions))
+    if not files:
+        parser.error("no input files found in {}".format(folder))
+
+    combos = [(s, i) for s in args.score_thresholds for i in args.iou_thresholds]
+    jobs = []
+    num_gt = 0
+    for name in files:
+        ground_truth = [tuple(box) for box in labels.get(os.path.splitext(name)[0], [])]
+        num_gt += len(ground_truth)
+        jobs.append((os.path.join(folder, name), ground_truth, combos, args.match_iou))
+
+    start = time.perf_counter()
+    with Pool(args.workers, initializer=init_worker,
+              initargs=(args.model if args.images else None,)) as pool:
+        file_results = pool.map(evaluate_file, jobs, chunksize=max(1, len(jobs) // (4 * args.workers)))
+    wall = time.perf_counter() - start
+
+    print("{} files, {} labelled faces, {} threshold combinations, {} workers".format(
+        len(files), num_gt, len(combos), args.workers))
+    print_table(summarize(combos, file_results, num_gt))
+    print("Total wall time: {:.2f} s ({:.1f} files/s across all combinations)".format(
+        wall, len(files) / wall))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,13 @@ Purpose: Handles behavior of agent (Smart Motor arm/servo) throughtout the episo
 *** For Engineering with Artificial Intelligence Pre-College Program at Tufts University ***
 """
 
-import urandom
+try:
+    import urandom
+except ImportError:
+    # running on a computer (e.g. sim.py) instead of the Smart Motor
+    import random as urandom
+from array import array
+from logger import log, DEBUG
 
 class QLearningAgent:
     # can change alpha, gamma, and epsilon values based on type of learning
@@ -15,34 +21,187 @@ class QLearningAgent:
         self.alpha = alpha
         self.gamma = gamma
         self.epsilon = epsilon
-        self.qtable = self.initialize_qtable()
         self.actions = ["LEFT", "RIGHT"]
+        self.n_actions = len(self.actions)
+        self.n_states = len(self.env.states)
+        self.qtable = self.initialize_qtable()
+        # highest q-value of each state, kept up to date by update_q()
+        self.qmax = array('f', [0] * self.n_states)
+        # next (state, action) when learn() has already picked it
+        self._next_state = None
+        self._next_action = 0
 
+    # flat q-table: the value of (state, action) is at state * n_actions + action
     def initialize_qtable(self):
-        table = {}
-        for key, val in enumerate(self.env.states):
-            qvalue = [0] * 2
-            table[val] = qvalue
-        return table
-    
+        return array('f', [0] * (self.n_states * self.n_actions))
+
+    # q-values of one state as a list (for printing)
+    def qvalues(self, state):
+        base = state * self.n_actions
+        return [self.qtable[base + a] for a in range(self.n_actions)]
+
+    def format_qtable(self):
+        return "{" + ", ".join("%d: [%s]" % (s, ", ".join("%.3f" % q for q in self.qvalues(s)))
+                               for s in range(self.n_states)) + "}"
+
+    # set one q-value and update the cached max of its state
+    def update_q(self, state, action, value):
+        base = state * self.n_actions
+        old = self.qtable[base + action]
+        self.qtable[base + action] = value
+        value = self.qtable[base + action]  # as stored (single precision)
+        best = self.qmax[state]
+        if value >= best:
+            self.qmax[state] = value
+        elif old == best:
+            # the max went down -- rescan this state's actions
+            best = self.qtable[base]
+            for a in range(1, self.n_actions):
+                if self.qtable[base + a] > best:
+                    best = self.qtable[base + a]
+            self.qmax[state] = best
+
+    # recompute every state's max from the q-table (after loading a saved table)
+    def rebuild_qmax(self):
+        for state in range(self.n_states):
+            base = state * self.n_actions
+            best = self.qtable[base]
+            for a in range(1, self.n_actions):
+                if self.qtable[base + a] > best:
+                    best = self.qtable[base + a]
+            self.qmax[state] = best
+
+    # called at the start of every episode (the runner and sim.train do this)
+    def start_episode(self):
+        self._next_state = None
+
     # determine which action to do (in this case, go left or right)
     def choose_action(self, state):
-        k = urandom.uniform(0, 1)
-        if self.epsilon > k:
-            print("Random action chosen")
-            action = urandom.choice(self.actions)
+        if self._next_state == state:
+            # already picked by learn() (SarsaAgent, QLambdaAgent)
+            action = self._next_action
+            self._next_state = None
         else:
-            actions = self.qtable[state]
-            max_val = max(actions)
-            indices = [i for i, val in enumerate(actions) if val == max_val]
-            action = self.actions[urandom.choice(indices)]
+            action = self.select_action(state)
         self.last_state = state
-        self.last_action = self.actions.index(action)
-        return action
-    
+        self.last_action = action
+        return self.actions[action]
+
+    # epsilon-greedy action index for state, without remembering it
+    def select_action(self, state):
+        k = urandom.uniform(0, 1)
+        if self.epsilon > k:
+            log.log(DEBUG, "random action", state)
+            return urandom.randint(0, self.n_actions - 1)
+        # best action from the q-table, ties broken at random
+        base = state * self.n_actions
+        best = self.qmax[state]
+        ties = 0
+        for a in range(self.n_actions):
+            if self.qtable[base + a] == best:
+                ties += 1
+        pick = urandom.randint(0, ties - 1)
+        for a in range(self.n_actions):
+            if self.qtable[base + a] == best:
+                if pick == 0:
+                    return a
+                pick -= 1
+
     # populating the q-table and calculating the reward
     def learn(self, reward, next_state):
-        predict = self.qtable[self.last_state][self.last_action]
-        target = reward + self.gamma * max(self.qtable[next_state])
-        self.qtable[self.last_state][self.last_action] += self.alpha * (target - predict)
-        print(f'Reward: {reward}, Q-table: {self.qtable}')
+        predict = self.qtable[self.last_state * self.n_actions + self.last_action]
+        target = reward + self.gamma * self.qmax[next_state]
+        value = predict + self.alpha * (target - predict)
+        self.update_q(self.last_state, self.last_action, value)
+        # compact record; print the whole table with format_qtable() between episodes
+        log.log(DEBUG, "learn", self.last_state, self.last_action, reward, value)
+
+# On-policy variant: the update uses the value of the action that will actually be
+# taken next (picked here, then returned by the next choose_action) instead of the best one.
+class SarsaAgent(QLearningAgent):
+    def learn(self, reward, next_state):
+        next_action = self.select_action(next_state)
+        predict = self.qtable[self.last_state * self.n_actions + self.last_action]
+        target = reward + self.gamma * self.qtable[next_state * self.n_actions + next_action]
+        value = predict + self.alpha * (target - predict)
+        self.update_q(self.last_state, self.last_action, value)
+        self._next_state = next_state
+        self._next_action = next_action
+        log.log(DEBUG, "learn", self.last_state, self.last_action, reward, value)
+
+# Watkins's Q(lambda): Q-learning with eligibility traces. Every update also goes to the
+# (state, action) pairs visited earlier in the episode, weighted by a trace that decays by
+# gamma * lambda_ per step, so a reward reaches back along the strip in a single episode.
+# Traces are cut after an exploratory (non-greedy) action, since the steps before it no
+# longer lead to the reward by following the best actions.
+class QLambdaAgent(QLearningAgent):
+    # min_trace: traces below this are dropped
+    def __init__(self, env, alpha=0.1, gamma=0.9, epsilon=0.1, lambda_=0.8, min_trace=0.01):
+        super().__init__(env, alpha, gamma, epsilon)
+        self.lambda_ = lambda_
+        self.min_trace = min_trace
+        self.traces = array('f', [0] * (self.n_states * self.n_actions))
+        self.traced = []    # indices with a non-zero trace
+
+    def start_episode(self):
+        super().start_episode()
+        for index in self.traced:
+            self.traces[index] = 0
+        self.traced = []
+
+    def learn(self, reward, next_state):
+        next_action = self.select_action(next_state)
+        greedy = self.qtable[next_state * self.n_actions + next_action] == self.qmax[next_state]
+        index = self.last_state * self.n_actions + self.last_action
+        delta = reward + self.gamma * self.qmax[next_state] - self.qtable[index]
+        # replacing traces: the pair just visited gets a trace of 1
+        if not self.traces[index]:
+            self.traced.append(index)
+        self.traces[index] = 1
+        decay = self.gamma * self.lambda_ if greedy else 0
+        step = self.alpha * delta
+        traced = []
+        for i in self.traced:
+            self.update_q(i // self.n_actions, i % self.n_actions, self.qtable[i] + step * self.traces[i])
+            trace = self.traces[i] * decay
+            if trace >= self.min_trace:
+                self.traces[i] = trace
+                traced.append(i)
+            else:
+                self.traces[i] = 0
+        self.traced = traced
+        self._next_state = next_state
+        self._next_action = next_action
+        log.log(DEBUG, "learn", self.last_state, self.last_action, reward, self.qtable[index])
+
+# Dyna-Q: Q-learning plus a model of the strip built from the real steps (which state and
+# reward each (state, action) led to last time). After every real step it replays
+# planning_steps remembered transitions as extra Q-updates -- cheap compared to moving the servo.
+class DynaQAgent(QLearningAgent):
+    def __init__(self, env, alpha=0.1, gamma=0.9, epsilon=0.1, planning_steps=10):
+        super().__init__(env, alpha, gamma, epsilon)
+        self.planning_steps = planning_steps
+        size = self.n_states * self.n_actions
+        self.model_next = array('h', [-1] * size)   # next state, -1 = never tried
+        self.model_reward = array('f', [0] * size)
+        self.observed = []    # indices of the (state, action) pairs tried so far
+
+    def learn(self, reward, next_state):
+        super().learn(reward, next_state)
+        index = self.last_state * self.n_actions + self.last_action
+        if self.model_next[index] < 0:
+            self.observed.append(index)
+        self.model_next[index] = next_state
+        self.model_reward[index] = reward
+        self.plan()
+
+    # planning_steps Q-updates on transitions picked at random from the model
+    def plan(self):
+        observed = self.observed
+        last = len(observed) - 1
+        for _ in range(self.planning_steps):
+            index = observed[urandom.randint(0, last)]
+            state, action = index // self.n_actions, index % self.n_actions
+            predict = self.qtable[index]
+            target = self.model_reward[index] + self.gamma * self.qmax[self.model_next[index]]
+            self.update_q(state, action, predict + self.alpha * (target - predict))
@@ -0,0 +1,172 @@
+"""
+File: batch_train.py
+Purpose: Hyperparameter sweep on a computer -- trains many Q-learning agents at once (one per
+         alpha/gamma/epsilon setting) on a NumPy model of the color strip, and reports how fast
+         each setting learns, to pick sensible defaults for the classroom run
+*** For Engineering with Artificial Intelligence Pre-College Program at Tufts University ***
+
+Run with regular Python from this folder (needs numpy), e.g.:
+    python batch_train.py --alphas 0.05,0.1,0.3,0.5 --gammas 0.8,0.9,0.99 \\
+        --epsilons 0.05,0.1,0.2 --repeats 200 --episodes 5
+"""
+
+import time
+
+import numpy as np
+
+LEFT = 0
+RIGHT = 1
+
+# many copies of the color strip, stepped together. Same interface as Environment
+# (reset, step, states, goal_state), with arrays of states/actions/rewards.
+# misread is the chance a reading is classified as a neighboring patch.
+class BatchStripEnvironment:
+    def __init__(self, batch, n_states=8, start_state=1, misread=0.05, rng=None):
+        self.batch = batch
+        self.n_states = n_states
+        self.states = dict.fromkeys(range(n_states))
+        self.goal_state = [n_states - 1]
+        self.end_state = [0, n_states - 1]
+        self.reward_default = -1
+        self.reward_goal = 10
+        self.action_space = ["LEFT", "RIGHT"]
+        self.start_state = start_state
+        self.misread = misread
+        self.rng = rng or np.random.default_rng()
+        self.position = np.zeros(batch, dtype=np.int64)   # patch under the sensor
+        self.current_state = np.zeros(batch, dtype=np.int64)  # patch the agent sees
+
+    def _observe(self):
+        wrong = self.rng.random(self.batch) < self.misread
+        shift = self.rng.choice((-1, 1), self.batch)
+        return np.clip(self.position + wrong * shift, 0, self.n_states - 1)
+
+    def reset(self):
+        self.position[:] = self.start_state
+        self.current_state = self._observe()
+        return self.current_state
+
+    def step(self, actions):
+        # LEFT moves toward the goal; RIGHT moves back unless the agent sees state 0
+        back = np.where(self.current_state != self.end_state[0], -1, 0)
+        move = np.where(actions == LEFT, 1, back)
+        self.position = np.clip(self.position + move, 0, self.n_states - 1)
+        self.current_state = self._observe()
+        done = self.current_state == self.goal_state[0]
+        reward = np.where(done, self.reward_goal, self.reward_default)
+        return self.current_state, reward, done
+
+# one Q-learning agent per row, same update rule as QLearningAgent
+class BatchQLearningAgent:
+    def __init__(self, env, alpha, gamma, epsilon, rng=None):
+        self.env = env
+        self.alpha = np.asarray(alpha, dtype=np.float32)
+        self.gamma = np.asarray(gamma, dtype=np.float32)
+        self.epsilon = np.asarray(epsilon, dtype=np.float32)
+        self.rng = rng or np.random.default_rng()
+        self.rows = np.arange(env.batch)
+        self.qtable = np.zeros((env.batch, len(env.states), len(env.action_space)), dtype=np.float32)
+
+    def choose_action(self, states):
+        q = self.qtable[self.rows, states]
+        # greedy with random tie-breaking: random weights on the tied maxima
+        ties = q == q.max(axis=1, keepdims=True)
+        greedy = np.argmax(ties * self.rng.random(q.shape), axis=1)
+        explore = self.rng.random(len(states)) < self.epsilon
+        random_action = self.rng.integers(0, q.shape[1], len(states))
+        self.last_state = states
+        self.last_action = np.where(explore, random_action, greedy)
+        return self.last_action
+
+    # active: rows still running this episode (finished agents are not updated)
+    def learn(self, reward, next_state, active):
+        rows, s, a = self.rows[active], self.last_state[active], self.last_action[active]
+        predict = self.qtable[rows, s, a]
+        target = reward[active] + self.gamma[active] * self.qtable[rows, next_state[active]].max(axis=1)
+        self.qtable[rows, s, a] = predict + self.alpha[active] * (target - predict)
+
+# train every (alpha, gamma, epsilon) setting `repeats` times.
+# Returns the settings and, per agent and episode, the step count and total reward.
+def sweep(alphas, gammas, epsilons, repeats=100, episodes=5, max_steps=15,
+          n_states=8, misread=0.05, seed=None):
+    rng = np.random.default_rng(seed)
+    grid = np.array(np.meshgrid(alphas, gammas, epsilons, indexing="ij")).reshape(3, -1).T
+    settings = np.repeat(grid, repeats, axis=0)
+    batch = len(settings)
+
+    env = BatchStripEnvironment(batch, n_states=n_states, misread=misread, rng=rng)
+    agent = BatchQLearningAgent(env, settings[:, 0], settings[:, 1], settings[:, 2], rng=rng)
+    steps = np.zeros((batch, episodes), dtype=np.int64)
+    rewards = np.zeros((batch, episodes), dtype=np.int64)
+    reached = np.zeros((batch, episodes), dtype=bool)
+
+    for ep in range(episodes):
+        state = env.reset()
+        active = np.ones(batch, dtype=bool)
+        for t in range(max_steps):
+            action = agent.choose_action(state)
+            next_state, reward, done = env.step(action)
+            agent.learn(reward, next_state, active)
+            steps[active, ep] += 1
+            rewards[active, ep] += reward[active]
+            reached[active & done, ep] = True
+            active &= ~done
+            state = next_state
+            if not active.any():
+                break
+    return grid, steps, rewards, reached
+
+# average the per-agent results of each setting
+def summarize(grid, steps, rewards, reached, repeats):
+    n = len(grid)
+    episodes = steps.shape[1]
+    steps = steps.reshape(n, repeats, episodes)
+    rewards = rewards.reshape(n, repeats, episodes)
+    reached = reached.reshape(n, repeats, episodes)
+    # first episode in which the goal was reached (episodes if never)
+    first_goal = np.where(reached.any(axis=2), reached.argmax(axis=2), episodes)
+    return steps.mean(axis=1), rewards.mean(axis=1), reached.mean(axis=1), first_goal.mean(axis=1)
+
+def parse_list(text):
+    return [float(value) for value in text.split(",") if value]
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Batched Q-learning hyperparameter sweep")
+    parser.add_argument("--alphas", type=parse_list, default=[0.05, 0.1, 0.3, 0.5])
+    parser.add_argument("--gammas", type=parse_list, default=[0.8, 0.9, 0.99])
+    parser.add_argument("--epsilons", type=parse_list, default=[0.05, 0.1, 0.2, 0.3])
+    parser.add_argument("--repeats", type=int, default=200, help="agents per setting")
+    parser.add_argument("--episodes", type=int, default=5)
+    parser.add_argument("--steps", type=int, default=15, help="max steps per episode")
+    parser.add_argument("--states", type=int, default=8, help="number of colors on the strip")
+    parser.add_argument("--misread", type=float, default=0.05)
+    parser.add_argument("--curves", action="store_true", help="print the per-episode curves")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    grid, steps, rewards, reached = sweep(args.alphas, args.gammas, args.epsilons, args.repeats,
+                                          args.episodes, args.steps, args.states, args.misread,
+                                          args.seed)
+    elapsed = time.perf_counter() - start
+    avg_steps, avg_reward, goal_rate, first_goal = summarize(grid, steps, rewards, reached, args.repeats)
+
+    # best settings first: highest average reward over the whole run
+    order = np.argsort(-avg_reward.mean(axis=1))
+    print(" alpha  gamma  epsilon  avg reward  last ep steps  last ep goal %  first goal ep")
+    for i in order:
+        alpha, gamma, epsilon = grid[i]
+        print("%6.2f %6.2f %8.2f %11.2f %14.2f %15.1f %14.2f" % (
+            alpha, gamma, epsilon, avg_reward[i].mean(), avg_steps[i, -1],
+            100 * goal_rate[i, -1], first_goal[i]))
+        if args.curves:
+            print("        steps:  " + " ".join("%5.1f" % v for v in avg_steps[i]))
+            print("        reward: " + " ".join("%5.1f" % v for v in avg_reward[i]))
+    total = len(grid) * args.repeats * args.episodes
+    print("%d settings x %d agents, %d episodes in %.2f s (%.0f episodes/s)" % (
+        len(grid), args.repeats, total, elapsed, total / elapsed))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+File: calibration.py
+Purpose: Captures the color of each state from several sensor readings (average color and
+         spread) and saves them with the files helpers, so restarts can skip recalibration
+*** For Engineering with Artificial Intelligence Pre-College Program at Tufts University ***
+"""
+
+import math
+import time
+from files import readfile, savetofile
+
+# read the patch under the sensor `samples` times, each one a new measurement (a reading
+# taken before the next measurement is done is not fresh and is skipped).
+# Returns [r, g, b, spread]: the average color and the RMS distance of the readings from it.
+# Environment uses the spread as each color's tolerance (see its spreads argument).
+def capture_color(sensor, samples=10):
+    readings = []
+    while len(readings) < samples:
+        rgb = sensor.rgb
+        if getattr(sensor, "fresh", True):
+            readings.append(rgb)
+        else:
+            # no new measurement yet
+            time.sleep_ms(2)
+    r = sum(c[0] for c in readings) // samples
+    g = sum(c[1] for c in readings) // samples
+    b = sum(c[2] for c in readings) // samples
+    variance = sum((c[0] - r) ** 2 + (c[1] - g) ** 2 + (c[2] - b) ** 2 for c in readings) // samples
+    return [r, g, b, int(math.sqrt(variance))]
+
+# saved calibration: one [r, g, b, spread] per state, or None if there is no
+# saved calibration for this number of states
+def load_calibration(num_states):
+    datapoints = readfile()
+    if not datapoints:
+        return None
+    entries = datapoints[-1]
+    if len(entries) != num_states or any(len(entry) != 4 for entry in entries):
+        return None
+    return entries
+
+def save_calibration(entries):
+    savetofile(entries)
@@ -0,0 +1,75 @@
+"""
+File: checkpoint.py
+Purpose: Saves the Q-table, the captured colors and the number of finished episodes to flash after
+         each episode, in a small binary file, so training picks up where it left off after a reset
+         or brownout instead of starting over
+*** For Engineering with Artificial Intelligence Pre-College Program at Tufts University ***
+"""
+
+import os
+import struct
+from array import array
+
+CHECKPOINT_FILE = "qtable.bin"
+
+# file layout (little-endian):
+#   header: magic, number of states, number of actions, finished episodes
+#   q-table: n_states * n_actions 32-bit floats (QLearningAgent.qtable as is)
+#   colors: n_states * 3 bytes, the captured [r, g, b] of each state
+_MAGIC = b"QTB1"
+_HEADER = "<4sHHH"
+_HEADER_SIZE = struct.calcsize(_HEADER)
+
+def _color_bytes(points):
+    return bytes(min(255, max(0, int(c))) for point in points for c in point[:3])
+
+# Write to a temporary file and rename it over the old checkpoint, so a reset
+# during the write leaves the previous checkpoint intact.
+def save_checkpoint(agent, points, episodes_done, path=CHECKPOINT_FILE):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(struct.pack(_HEADER, _MAGIC, agent.n_states, agent.n_actions, episodes_done))
+        f.write(agent.qtable)
+        f.write(_color_bytes(points))
+    try:
+        os.rename(tmp, path)
+    except OSError:
+        # file systems that do not rename over an existing file
+        os.remove(path)
+        os.rename(tmp, path)
+
+# Load a checkpoint into agent's q-table. Returns (finished episodes, colors), or
+# None if there is no checkpoint or it was saved for a different number of states/actions
+# (or, if points is given, for different colors).
+def load_checkpoint(agent, points=None, path=CHECKPOINT_FILE):
+    try:
+        f = open(path, "rb")
+    except OSError:
+        return None
+    with f:
+        header = f.read(_HEADER_SIZE)
+        if len(header) != _HEADER_SIZE:
+            return None
+        magic, n_states, n_actions, episodes_done = struct.unpack(_HEADER, header)
+        if magic != _MAGIC or n_states != agent.n_states or n_actions != agent.n_actions:
+            return None
+        # read into a spare table so a damaged file leaves the agent untouched
+        qtable = array('f', [0] * len(agent.qtable))
+        if f.readinto(qtable) != len(qtable) * 4:
+            return None
+        colors = f.read(n_states * 3)
+        if len(colors) != n_states * 3:
+            return None
+        if points is not None and colors != _color_bytes(points):
+            return None
+    for i in range(len(qtable)):
+        agent.qtable[i] = qtable[i]
+    agent.rebuild_qmax()
+    points = [list(colors[i:i + 3]) for i in range(0, len(colors), 3)]
+    return episodes_done, points
+
+def clear_checkpoint(path=CHECKPOINT_FILE):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
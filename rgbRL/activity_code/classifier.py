@@ -0,0 +1,115 @@
+"""
+File: classifier.py
+Purpose: Fast color classification -- precomputes which captured color is nearest to every
+         quantized RGB value, so classifying a sensor reading is a single table lookup
+*** For Engineering with Artificial Intelligence Pre-College Program at Tufts University ***
+"""
+
+import math
+import struct
+
+# saved table layout: header (magic, bits, has ratio table, number of colors),
+# the colors as [r, g, b] bytes, then the lut and ratio tables as they are in RAM
+_MAGIC = b"LUT1"
+_HEADER = "<4sBBH"
+_HEADER_SIZE = struct.calcsize(_HEADER)
+
+class ColorClassifier:
+    # colors: captured [r, g, b] of each state, labels: the state of each color
+    # bits: bits kept per channel, 5 -> 32x32x32 bins (32 KB table)
+    # confidence: also build a second table of how close each bin is to being a tie
+    #             between its two nearest colors (another 32 KB)
+    # path: file to load the tables from if they were saved for the same colors, and to
+    #       save them to after building -- building takes 32768 x colors distance checks,
+    #       which takes seconds on the Smart Motor, so only do it after a recalibration
+    def __init__(self, colors, labels, bits=5, confidence=False, path=None):
+        self.colors = colors
+        self.labels = labels
+        self.bits = bits
+        self.shift = 8 - bits
+        self.lut = bytearray(1 << (3 * bits))
+        # 255 * (nearest distance / second nearest distance)^2 for each bin
+        self.ratio = bytearray(1 << (3 * bits)) if confidence else None
+        if path is None or not self.load(path):
+            self.build()
+            if path is not None:
+                self.save(path)
+
+    def _header(self):
+        colors = bytes(min(255, max(0, int(c))) for color in self.colors for c in color[:3])
+        return struct.pack(_HEADER, _MAGIC, self.bits, self.ratio is not None, len(self.colors)) + colors
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self._header())
+            f.write(self.lut)
+            if self.ratio is not None:
+                f.write(self.ratio)
+
+    # load tables saved for the same colors and settings; False if there are none
+    def load(self, path):
+        header = self._header()
+        try:
+            f = open(path, "rb")
+        except OSError:
+            return False
+        with f:
+            if f.read(len(header)) != header:
+                return False
+            if f.readinto(self.lut) != len(self.lut):
+                return False
+            if self.ratio is not None and f.readinto(self.ratio) != len(self.ratio):
+                return False
+        return True
+
+    # fill the table with the index of the nearest color to the center of each bin.
+    # Squared distances are enough to compare, so no sqrt is needed.
+    def build(self):
+        n = 1 << self.bits
+        size = 1 << self.shift
+        centers = [i * size + size // 2 for i in range(n)]
+        # squared distance along each channel, per color and bin
+        dr = [[(c - col[0]) ** 2 for c in centers] for col in self.colors]
+        dg = [[(c - col[1]) ** 2 for c in centers] for col in self.colors]
+        db = [[(c - col[2]) ** 2 for c in centers] for col in self.colors]
+        ncolors = len(self.colors)
+        partial = [0] * ncolors
+        lut = self.lut
+        ratio = self.ratio
+        index = 0
+        for ri in range(n):
+            for gi in range(n):
+                for k in range(ncolors):
+                    partial[k] = dr[k][ri] + dg[k][gi]
+                for bi in range(n):
+                    best = 0
+                    best_dist = partial[0] + db[0][bi]
+                    second_dist = 1 << 30
+                    for k in range(1, ncolors):
+                        dist = partial[k] + db[k][bi]
+                        if dist < best_dist:
+                            second_dist = best_dist
+                            best_dist = dist
+                            best = k
+                        elif dist < second_dist:
+                            second_dist = dist
+                    lut[index] = best
+                    if ratio is not None:
+                        ratio[index] = 255 * best_dist // second_dist if second_dist else 255
+                    index += 1
+
+    def bin_index(self, rgb):
+        s = self.shift
+        b = self.bits
+        return ((rgb[0] >> s) << (2 * b)) | ((rgb[1] >> s) << b) | (rgb[2] >> s)
+
+    # state of the nearest captured color
+    def classify(self, rgb):
+        return self.labels[self.lut[self.bin_index(rgb)]]
+
+    # state of the nearest captured color and a confidence from 0 (halfway between
+    # two colors) to 1 (exactly on a color): 1 - nearest / second nearest distance
+    # (needs confidence=True)
+    def classify_with_confidence(self, rgb):
+        index = self.bin_index(rgb)
+        return self.labels[self.lut[index]], 1 - math.sqrt(self.ratio[index] / 255)
@@ -8,10 +8,34 @@ Purpose: Handles environment aspects of episodes (i.e. sensing colors and moving
 
 import time
 import math
+from logger import log, WARN, DEBUG
+from classifier import ColorClassifier
 
 class Environment:
-    def __init__(self, points, index, servo, sensor):
+    # lut_bits: bits per channel of the color lookup table built from the captured
+    # colors (see classifier.py); None searches all colors on every reading instead
+    # lut_path: file the table is saved to and reloaded from, so it is only rebuilt when
+    # the colors change (building it takes seconds on the Smart Motor)
+    # min_confidence: re-sample readings whose classification confidence is below this
+    # (e.g. halfway between two patches), up to max_resamples times; None accepts every reading
+    # spreads: calibration spread of each color (see calibration.py); readings farther than
+    # spread_scale * spread (at least min_tolerance) from their nearest color are re-sampled
+    # the same way; None skips this check
+    def __init__(self, points, index, servo, sensor, lut_bits=5, min_confidence=None, max_resamples=3,
+                 spreads=None, spread_scale=3, min_tolerance=12, lut_path=None):
         self.states = dict(zip(index, points))
+        self.min_confidence = min_confidence
+        self.max_resamples = max_resamples
+        # squared distance allowed from each color
+        self.tolerances = None
+        if spreads is not None:
+            self.tolerances = {state: max(spread_scale * spread, min_tolerance) ** 2
+                               for state, spread in zip(index, spreads)}
+        self.classifier = None
+        if lut_bits:
+            self.classifier = ColorClassifier(list(self.states.values()), list(self.states.keys()),
+                                              lut_bits, confidence=min_confidence is not None,
+                                              path=lut_path)
         self.goal_state = [len(points) - 1]
         self.end_state = [0, len(index)-1]
         self.reward_default = -1
@@ -22,32 +46,161 @@ class Environment:
         self.angle = 180 // len(points)
         self.servo = servo
         self.sensor = sensor
+        # settling after a servo move (see settle)
+        self.settle_min = 150         # ms to wait before polling -- lets the servo start moving
+        self.settle_timeout = 2000    # ms -- give up and read anyway
+        self.settle_count = 3         # stable readings in a row needed
+        self.settle_tolerance = 0.03  # allowed change between readings, fraction of clear channel
 
     def reset(self):
+        self.begin_reset()
+        self.settle()
+        return self.finish_reset()
+
+    # reset in two parts, for callers that do other work while the servo moves
+    # (see runner.py): begin_reset, then poll_settle until it returns True, then finish_reset
+    def begin_reset(self):
         self.servo.write_angle(self.angle)
-        time.sleep(2)
-        self.current_state = self.nearestNeighbor(self.sensor.rgb)
+        self.begin_settle()
+
+    def finish_reset(self):
+        self.current_state = self.read_state()
         return self.current_state
 
     def reset_cur_angle(self, reset_angle):
         self.current_angle = reset_angle
 
+    # wait for the servo to reach its new angle before reading the sensor (timed from
+    # begin_settle, called by begin_reset and move): poll the raw channels until
+    # settle_count new measurements in a row (see the sensor's fresh flag) agree within
+    # settle_tolerance, or settle_timeout ms have passed
+    def settle(self):
+        while not self.poll_settle():
+            time.sleep_ms(2)
+
+    def begin_settle(self):
+        self._settle_start = time.ticks_ms()
+        self._settle_last = None
+        self._settle_stable = 0
+
+    # one settling check, without blocking (apart from one sensor reading once
+    # settle_min has passed); True once the servo has settled
+    def poll_settle(self):
+        elapsed = time.ticks_diff(time.ticks_ms(), self._settle_start)
+        if elapsed < self.settle_min:
+            return False
+        if elapsed > self.settle_timeout:
+            return True
+        reading = self.sensor.raw
+        if not getattr(self.sensor, "fresh", True):
+            # no new measurement since the last reading -- only new ones count
+            return False
+        last = self._settle_last
+        if last is None:
+            self._settle_last = reading
+            return False
+        limit = reading[3] * self.settle_tolerance + 2
+        self._settle_stable += 1
+        for i in range(4):
+            if abs(reading[i] - last[i]) > limit:
+                self._settle_stable = 0
+                break
+        self._settle_last = reading
+        return self._settle_stable >= self.settle_count
+
     # nearest neighbor algorithm to determine closest color match
     def euclidean_distance(self, color1, color2):
         return math.sqrt(sum((c1 - c2) ** 2 for c1, c2 in zip(color1, color2)))
 
     def nearestNeighbor(self, current_rgb):
+        if self.classifier is not None:
+            closest_color = self.classifier.classify(current_rgb)
+            log.log(DEBUG, "closest color", closest_color)
+            return closest_color
+        # compare squared distances -- same order as euclidean_distance, without the sqrt
         closest_color = None
         min_distance = float('inf')
         for color_name, color_value in self.states.items():
-            distance = self.euclidean_distance(current_rgb, color_value)
+            distance = sum((c1 - c2) ** 2 for c1, c2 in zip(current_rgb, color_value))
             if distance < min_distance:
                 min_distance = distance
                 closest_color = color_name
-        print("The closest color is:", closest_color)
+        log.log(DEBUG, "closest color", closest_color)
         return closest_color
 
+    # closest color plus a confidence: 1 - (nearest distance / second nearest distance)
+    def nearestNeighborConfidence(self, current_rgb):
+        if self.classifier is not None:
+            return self.classifier.classify_with_confidence(current_rgb)
+        closest_color = None
+        min_distance = second_distance = float('inf')
+        for color_name, color_value in self.states.items():
+            distance = sum((c1 - c2) ** 2 for c1, c2 in zip(current_rgb, color_value))
+            if distance < min_distance:
+                second_distance = min_distance
+                min_distance = distance
+                closest_color = color_name
+            elif distance < second_distance:
+                second_distance = distance
+        if second_distance == float('inf'):
+            return closest_color, 1.0   # only one color
+        if second_distance == 0:
+            return closest_color, 0.0   # two identical colors
+        return closest_color, 1 - math.sqrt(min_distance / second_distance)
+
+    # next new measurement from the sensor (a reading taken right after another one
+    # would otherwise repeat the same measurement)
+    def fresh_rgb(self):
+        rgb = self.sensor.rgb
+        while not getattr(self.sensor, "fresh", True):
+            time.sleep_ms(2)
+            rgb = self.sensor.rgb
+        return rgb
+
+    # classify one reading: (state, confidence, accepted). accepted is False if the
+    # confidence is below min_confidence or the reading is outside the state's tolerance.
+    # confidence is None when min_confidence is not set.
+    def classify_reading(self, rgb):
+        if self.min_confidence is None:
+            state, confidence = self.nearestNeighbor(rgb), None
+            accepted = True
+        else:
+            state, confidence = self.nearestNeighborConfidence(rgb)
+            accepted = confidence >= self.min_confidence
+        if accepted and self.tolerances is not None:
+            color = self.states[state]
+            distance = (rgb[0] - color[0]) ** 2 + (rgb[1] - color[1]) ** 2 + (rgb[2] - color[2]) ** 2
+            accepted = distance <= self.tolerances[state]
+        return state, confidence, accepted
+
+    # read the sensor and classify the color. Only when min_confidence or spreads are
+    # set, readings that fail those checks (see classify_reading) are re-sampled from new
+    # measurements, up to max_resamples times; if the reading still fails after that,
+    # the last classification is kept and a warning is logged.
+    def read_state(self):
+        current_rgb = self.sensor.rgb
+        if self.min_confidence is None and self.tolerances is None:
+            return self.nearestNeighbor(current_rgb)
+        state, confidence, accepted = self.classify_reading(current_rgb)
+        resamples = 0
+        while not accepted:
+            if resamples == self.max_resamples:
+                log.log(WARN, "ambiguous color kept", state, confidence, current_rgb)
+                break
+            log.log(DEBUG, "ambiguous color", state, confidence, current_rgb)
+            current_rgb = self.fresh_rgb()
+            state, confidence, accepted = self.classify_reading(current_rgb)
+            resamples += 1
+        log.log(DEBUG, "closest color", state, confidence)
+        return state
+
     def step(self, action):
+        self.move(action)
+        self.settle()
+        return self.finish_step()
+
+    # step in two parts, like reset: move, then poll_settle until it returns True, then finish_step
+    def move(self, action):
         if action == "LEFT":
             self.current_angle = min(180, self.current_angle + self.angle)
             self.servo.write_angle(self.current_angle)
@@ -55,8 +208,10 @@ class Environment:
             if self.current_state != self.end_state[0]:
                 self.current_angle = max(0, self.current_angle - self.angle)
                 self.servo.write_angle(self.current_angle)
-        time.sleep(2)
-        self.current_state = self.nearestNeighbor(self.sensor.rgb)
+        self.begin_settle()
+
+    def finish_step(self):
+        self.current_state = self.read_state()
         reward = self.reward_goal if self.current_state in self.goal_state else self.reward_default
         done = self.current_state in self.goal_state
         return self.current_state, reward, done
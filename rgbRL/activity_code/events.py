@@ -0,0 +1,72 @@
+"""
+File: events.py
+Purpose: Button presses and timer ticks as events -- interrupt handlers only note the event in a
+         small queue (a few microseconds, no allocation) and the main loop does the actual work,
+         so redrawing the display never holds up a sensor read
+*** For Engineering with Artificial Intelligence Pre-College Program at Tufts University ***
+"""
+
+from machine import Pin
+from time import ticks_ms, ticks_diff
+
+# event codes (0 means no event)
+UP = 1
+DOWN = 2
+SELECT = 3
+BATTERY = 4
+
+# Ring buffer of one-byte events. post() is only called from interrupt handlers and
+# get() only from the main loop; each one moves its own index, so no locking is needed.
+class EventQueue:
+    def __init__(self, size=16):
+        self.buffer = bytearray(size)
+        self.head = 0   # next slot to write (post)
+        self.tail = 0   # next slot to read (get)
+
+    # returns False (and drops the event) if the queue is full
+    def post(self, event):
+        head = self.head + 1
+        if head == len(self.buffer):
+            head = 0
+        if head == self.tail:
+            return False
+        self.buffer[self.head] = event
+        self.head = head
+        return True
+
+    # next event, or 0 if there is none
+    def get(self):
+        tail = self.tail
+        if tail == self.head:
+            return 0
+        event = self.buffer[tail]
+        tail += 1
+        self.tail = 0 if tail == len(self.buffer) else tail
+        return event
+
+# Post an event when a button is pressed (pins read 0 while pressed). Every edge, pressing
+# or releasing, restarts the button's debounce window; an edge only counts as a press if
+# the button was quiet for debounce_ms before it and the pin still reads 0, so contact
+# bounce on press or on release never posts a second event.
+class Buttons:
+    # pins: {event: Pin}, e.g. {UP: switches["up"], DOWN: switches["down"], SELECT: switches["select"]}
+    def __init__(self, queue, pins, debounce_ms=50):
+        self.queue = queue
+        self.debounce_ms = debounce_ms
+        self.pins = pins
+        self._last = [ticks_ms()] * len(pins)
+        for index, (event, pin) in enumerate(pins.items()):
+            pin.irq(handler=self._handler(event, index), trigger=Pin.IRQ_FALLING | Pin.IRQ_RISING)
+
+    def _handler(self, event, index):
+        def handler(pin):
+            now = ticks_ms()
+            quiet = ticks_diff(now, self._last[index]) >= self.debounce_ms
+            self._last[index] = now
+            if quiet and pin.value() == 0:
+                self.queue.post(event)
+        return handler
+
+    def disable(self):
+        for pin in self.pins.values():
+            pin.irq(handler=None)
@@ -0,0 +1,110 @@
+"""
+File: flashlog.py
+Purpose: Activity log kept as small binary records in a RAM ring buffer and written to flash in
+         blocks, so logging a battery reading only packs a few bytes and flash is written (and worn) far
+         less often than once every 3 seconds
+*** For Engineering with Artificial Intelligence Pre-College Program at Tufts University ***
+"""
+
+import os
+import struct
+try:
+    from time import ticks_ms, ticks_diff
+except ImportError:
+    # running on a computer instead of the Smart Motor
+    import time
+
+    def ticks_ms():
+        return int(time.monotonic() * 1000)
+
+    def ticks_diff(a, b):
+        return a - b
+
+LOG_FILE = "log.bin"
+
+# one record: time (s), screen, highlighted icon on that screen, battery reading
+RECORD = "<IBBf"
+RECORD_SIZE = struct.calcsize(RECORD)
+
+class FlashLog:
+    # capacity: records held in RAM; if flash is not written in time the oldest are dropped
+    # flush_at: pending records that trigger a write
+    # idle_ms: also write pending records when this long has passed since the last write
+    # max_size: bytes before the file is moved to <path>.old and a new one started
+    def __init__(self, path=LOG_FILE, capacity=64, flush_at=32, idle_ms=60000, max_size=32768):
+        self.path = path
+        self.capacity = capacity
+        self.flush_at = flush_at
+        self.idle_ms = idle_ms
+        self.max_size = max_size
+        self.buffer = bytearray(capacity * RECORD_SIZE)
+        # add() only changes added and flush() only changes flushed, so a timer
+        # callback can add records while the main loop is writing them out
+        self.added = 0
+        self.flushed = 0
+        self.dropped = 0
+        self._last_flush = ticks_ms()
+
+    # pack one record into the ring buffer -- no allocation, safe in a timer callback
+    def add(self, t, screen, icon, battery):
+        offset = (self.added % self.capacity) * RECORD_SIZE
+        struct.pack_into(RECORD, self.buffer, offset, int(t), screen & 0xFF, icon & 0xFF, battery)
+        self.added += 1
+
+    @property
+    def pending(self):
+        return self.added - self.flushed
+
+    # call when the main loop has nothing else to do: writes the pending records
+    # once there are flush_at of them, or idle_ms after the last write
+    def service(self):
+        pending = self.pending
+        if pending >= self.flush_at or (pending and ticks_diff(ticks_ms(), self._last_flush) >= self.idle_ms):
+            self.flush()
+
+    # append the pending records to the file in one or two writes
+    def flush(self):
+        added = self.added
+        start = self.flushed
+        if added - start > self.capacity:
+            self.dropped += added - start - self.capacity
+            start = added - self.capacity
+        if added > start:
+            self._rotate()
+            buf = memoryview(self.buffer)
+            first = start % self.capacity
+            end = first + (added - start)
+            with open(self.path, "ab") as f:
+                f.write(buf[first * RECORD_SIZE:min(end, self.capacity) * RECORD_SIZE])
+                if end > self.capacity:
+                    f.write(buf[:(end - self.capacity) * RECORD_SIZE])
+        self.flushed = added
+        self._last_flush = ticks_ms()
+
+    def _rotate(self):
+        try:
+            size = os.stat(self.path)[6]
+        except OSError:
+            return
+        if size >= self.max_size:
+            try:
+                os.remove(self.path + ".old")
+            except OSError:
+                pass
+            os.rename(self.path, self.path + ".old")
+
+    # start a new log (drops pending records too)
+    def clear(self):
+        for path in (self.path, self.path + ".old"):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self.flushed = self.added
+
+# the records of a log file, oldest first, as (time, screen, icon, battery) tuples
+def read_records(path=LOG_FILE):
+    with open(path, "rb") as f:
+        data = f.read()
+    return [struct.unpack_from(RECORD, data, i)
+            for i in range(0, len(data) - RECORD_SIZE + 1, RECORD_SIZE)]
@@ -14,9 +14,10 @@ def setup_servo():
     return servo.Servo(Pin(2))
 
 # Set up the display with I2C and return display object
-def setup_display():
+# bus: the i2c_bus.SharedBus shared with the color sensor (a new SoftI2C if not given)
+def setup_display(bus=None):
     switch_up = Pin(10, Pin.IN)
-    i2c = SoftI2C(scl=Pin(7), sda=Pin(6))
+    i2c = bus if bus is not None else SoftI2C(scl=Pin(7), sda=Pin(6))
     return icons.SSD1306_SMART(128, 64, i2c, switch_up), switch_up
 
 # Set up and return navigation switch objects
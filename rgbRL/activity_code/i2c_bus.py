@@ -0,0 +1,19 @@
+"""
+File: i2c_bus.py
+Purpose: One shared I2C bus (pins 7/6) for the display and the color sensor, so both use the same
+         SoftI2C instead of each driving pins 7/6 with its own
+*** For Engineering with Artificial Intelligence Pre-College Program at Tufts University ***
+"""
+
+from machine import Pin, SoftI2C
+
+class SharedBus:
+    # Pass a SharedBus wherever a SoftI2C is expected (display, sensor): every SoftI2C
+    # method is passed through to the one shared bus. Transactions never overlap because
+    # bus work only runs from the main loop -- button and timer interrupts just post
+    # events (see events.py).
+    def __init__(self, scl_pin=7, sda_pin=6, freq=100000, i2c=None):
+        self.i2c = i2c if i2c is not None else SoftI2C(scl=Pin(scl_pin), sda=Pin(sda_pin), freq=freq)
+
+    def __getattr__(self, name):
+        return getattr(self.i2c, name)
@@ -0,0 +1,74 @@
+"""
+File: logger.py
+Purpose: Buffered console logging with levels and rate limiting, so printing over the serial console
+         does not hold up the control loop
+*** For Engineering with Artificial Intelligence Pre-College Program at Tufts University ***
+"""
+
+try:
+    from time import ticks_ms, ticks_diff
+except ImportError:
+    # running on a computer (e.g. sim.py) instead of the Smart Motor
+    import time
+
+    def ticks_ms():
+        return int(time.monotonic() * 1000)
+
+    def ticks_diff(a, b):
+        return a - b
+
+# log levels -- a record is kept if its level <= Logger.level
+ERROR = 0
+WARN = 1
+INFO = 2
+DEBUG = 3
+
+class Logger:
+    def __init__(self, level=INFO, batch_size=32):
+        self.level = level
+        self.batch_size = batch_size
+        self.records = []       # (tag, fields) -- formatted only when flushed
+        self.dropped = 0        # records skipped by rate limiting
+        self.intervals = {}     # tag -> minimum ms between records
+        self.last_time = {}     # tag -> ticks of the last kept record
+
+    # keep at most one record per interval_ms for this tag
+    def limit(self, tag, interval_ms):
+        self.intervals[tag] = interval_ms
+
+    def enabled(self, level):
+        return level <= self.level
+
+    def log(self, level, tag, *fields):
+        if level > self.level:
+            return
+        interval = self.intervals.get(tag)
+        if interval:
+            now = ticks_ms()
+            last = self.last_time.get(tag)
+            if last is not None and ticks_diff(now, last) < interval:
+                self.dropped += 1
+                return
+            self.last_time[tag] = now
+        self.records.append((tag, fields))
+        if len(self.records) >= self.batch_size:
+            self.flush()
+
+    # print all buffered records in one write -- call when the loop is idle
+    def flush(self):
+        if not self.records:
+            return
+        lines = []
+        for tag, fields in self.records:
+            if fields:
+                lines.append(tag + ": " + " ".join(str(f) for f in fields))
+            else:
+                lines.append(tag)
+        self.records = []
+        if self.dropped:
+            lines.append("(%d records rate limited)" % self.dropped)
+            self.dropped = 0
+        print("\n".join(lines))
+
+# shared logger used by the activity files
+log = Logger()
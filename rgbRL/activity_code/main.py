@@ -8,70 +8,73 @@ Purpose: MicroPython program to load Reinforcement Learning activity onto Smart
 
 from machine import Timer
 import time
-from files import readfile, resetlog, setprefs, resetprefs, savetolog
+from files import resetlog, setprefs, resetprefs
+from flashlog import FlashLog
 from prefs import log as prefs_log
+from logger import log, ERROR, INFO, DEBUG
 
 from state import *
-from agent import QLearningAgent
+from agent import QLearningAgent, SarsaAgent, QLambdaAgent, DynaQAgent
 from environment import Environment
+from runner import EpisodeRunner
+from calibration import capture_color, load_calibration, save_calibration
+from checkpoint import save_checkpoint, load_checkpoint, clear_checkpoint
 from sensor_driver import GroveI2cColorSensorV2
+from i2c_bus import SharedBus
+from events import EventQueue, Buttons, UP, DOWN, SELECT, BATTERY
 from hardware import setup_servo, setup_display, setup_switches
 from ui import uppressed, downpressed, selectpressed, resettohome
 
 # setting up hardware -- importing functions from other files
 servo = setup_servo()
-display, switch_up = setup_display()
+bus = SharedBus()  # display and sensor share pins 7/6
+display, switch_up = setup_display(bus)
 switches = setup_switches()
-sensor = GroveI2cColorSensorV2()
+sensor = GroveI2cColorSensorV2(bus=bus, auto_exposure=True)
+try:
+    from sensors import SENSORS  # Smart Motor board module, reads the battery (as in reference.py)
+    battery = SENSORS()
+except ImportError:
+    battery = None  # no battery reading -- the battery timer is not started
+flashlog = FlashLog()  # written to flash from the main loop, see FlashLog.service
+events = EventQueue()  # filled by the button interrupts and battery timer, see handle_events
 
 # initialize display state
 numberofIcons = [5, 4, 2, 1, 1]  # example icon counts
 highlightedIcon.extend([[0, n] for n in numberofIcons])
 display.welcomemessage()
 
-# handle different switch states -- used for different modes
-def check_switch(p):
-    global switch_state_up, switch_state_down, switch_state_select
-    global last_switch_state_up, last_switch_state_down, last_switch_state_select
-    global switched_up, switched_down, switched_select
-
-    switch_state_up = switches["up"].value()
-    switch_state_down = switches["down"].value()
-    switch_state_select = switches["select"].value()
-
-    if switch_state_up != last_switch_state_up:
-        switched_up = True
-    elif switch_state_down != last_switch_state_down:
-        switched_down = True
-    elif switch_state_select != last_switch_state_select:
-        switched_select = True
-
-    if switched_up and switch_state_up == 0:
-        uppressed(display)
-        switched_up = False
-    elif switched_down and switch_state_down == 0:
-        downpressed(display)
-        switched_down = False
-    elif switched_select and switch_state_select == 0:
-        selectpressed()
-        switched_select = False
-
-    last_switch_state_up = switch_state_up
-    last_switch_state_down = switch_state_down
-    last_switch_state_select = switch_state_select
-
 # display the battery status
-def displaybatt(p):
-    batterycharge = sensor.readbattery()
+def showbatt():
+    batterycharge = battery.readbattery()
     display.showbattery(batterycharge)
     if LOGGING:
-        savetolog(time.time(), screenID, highlightedIcon, None, points)
-    return batterycharge
+        flashlog.add(time.time(), screenID, highlightedIcon[screenID][0], batterycharge)
+
+# do the work for the button presses and battery ticks posted since the last call;
+# a handler that fails is logged and skipped so it cannot stop calibration or training
+def handle_events():
+    while True:
+        event = events.get()
+        if not event:
+            break
+        try:
+            if event == UP:
+                uppressed(display)
+            elif event == DOWN:
+                downpressed(display)
+            elif event == SELECT:
+                selectpressed()
+            elif event == BATTERY:
+                showbatt()
+        except Exception as e:
+            log.log(ERROR, "event failed", event, repr(e))
 
 # set logging preferences
 def setloggingmode():
     if not switches["down"].value() and not switches["up"].value() and not switches["select"].value():
         resetlog()
+        flashlog.clear()
         setprefs()
         display.showmessage("LOG: ON")
     elif not switches["down"].value() and not switches["up"].value() and switches["select"].value():
@@ -79,75 +82,97 @@ def setloggingmode():
         display.showmessage("LOG: OFF")
     return prefs_log
 
-# read in data points from a given file
-def readdatapoints():
-    datapoints = readfile()
-    if datapoints:
-        return datapoints[-1]
-    return []
-
 # initialize timers and run main loop
 def main():
+    # actual RL activity code:
+    numStates = 8 # CHANGE THIS BASED ON HOW MANY COLORS THERE ARE
+    indices = list(range(numStates))
+    VERBOSE = False # CHANGE TO True TO PRINT EVERY STEP (actions, colors, q-updates)
+    log.level = DEBUG if VERBOSE else INFO
+    VERBOSE_INTERVAL_MS = 100 # at most one per-step message of each kind per 100 ms (0 = print all)
+    for tag in ("learn", "closest color", "ambiguous color", "random action"):
+        log.limit(tag, VERBOSE_INTERVAL_MS)
+    MIN_CONFIDENCE = None # e.g. 0.2 TO RE-READ THE SENSOR WHEN IT IS BETWEEN TWO COLORS
+    RECALIBRATE = False # CHANGE TO True TO CAPTURE THE COLORS AGAIN
+    CALIBRATION_SAMPLES = 10 # sensor readings averaged for each color
+    SPREAD_CHECK = True # RE-READ COLORS FARTHER THAN 3x THEIR CALIBRATION SPREAD FROM EVERY CAPTURED COLOR
+    RESUME = True # CHANGE TO False TO START TRAINING OVER (clears the saved Q-table)
+    EPISODES = 5 # CHANGE NUMBER BASED ON HOW MANY EPISODES
+    MAX_STEPS = 15 # CHANGE NUMBER BASED ON HOW MANY STEPS PER EPISODE
+
     global points
-    points = readdatapoints()
+    calibration = None if RECALIBRATE else load_calibration(numStates)
+    points = [entry[:3] for entry in calibration] if calibration else []
     if not points:
         highlightedIcon[1][0] = 1
 
-    tim = Timer(0)
-    tim.init(period=50, mode=Timer.PERIODIC, callback=check_switch)
-    batt = Timer(2)
-    batt.init(period=3000, mode=Timer.PERIODIC, callback=displaybatt)
+    buttons = Buttons(events, {UP: switches["up"], DOWN: switches["down"], SELECT: switches["select"]})
+    if battery is not None:
+        batt = Timer(2)
+        batt.init(period=3000, mode=Timer.PERIODIC, callback=lambda t: events.post(BATTERY))
 
     global LOGGING
     LOGGING = setloggingmode()
     display.selector(screenID, highlightedIcon[screenID][0], -1)
 
-    # actual RL activity code:
-    numStates = 8 # CHANGE THIS BASED ON HOW MANY COLORS THERE ARE
-    indices = list(range(numStates))
-
-    # collect all the different colors
-    while numStates:
-        r, g, b = sensor.rgb
-        currAngle = 0
-
-        # add the colors to the possible states
-        if flags[1]:
-            numStates -= 1
-            points.append([r, g, b])
-            print(f"State {len(points)-1} | Color: {points[-1]}")
-            currAngle += (180//numStates)
-            servo.write_angle(currAngle)
+    if calibration:
+        for state, entry in enumerate(calibration):
+            print(f"State {state} | Color: {entry[:3]} | Spread: {entry[3]} (saved)")
+    else:
+        # collect all the different colors -- press select with the sensor over each color
+        calibration = []
+        while len(calibration) < numStates:
+            handle_events()
+            if not flags[1]:
+                flashlog.service()
+                time.sleep_ms(20)
+                continue
+            entry = capture_color(sensor, CALIBRATION_SAMPLES)
+            calibration.append(entry)
+            points.append(entry[:3])
+            print(f"State {len(points)-1} | Color: {points[-1]} | Spread: {entry[3]}")
+            # move to the next color (same spacing the environment uses)
+            servo.write_angle(min(180, len(points) * (180 // numStates)))
             resetflags()
-
-    env = Environment(points, indices, servo, sensor)
-    agent = QLearningAgent(env, epsilon=0.1)
-
-    # run the episodes
-    for ep in range(5): # CHANGE NUMBER BASED ON HOW MANY EPISODES
-        print(f"EPISODE {ep}: Move to START state")
-        while not flags[0]: pass
-        time.sleep(1)
-        state = env.reset()
-        reward_total, step_count = 0, 0
-
-        # run through each episode -- has 15 steps
-        for t in range(15):
-            print(f"TIMESTEP {t}")
-            action = agent.choose_action(state)
-            next_state, reward, done = env.step(action)
-            agent.learn(reward, next_state)
-            state = next_state
-            reward_total += reward
-            step_count += 1
-            if done:
-                print("Goal reached!")
-                break
-
-        # reset angle of servo after each episode
-        servo.write_angle(180 // len(points))
-        env.reset_cur_angle(180 // len(points))
+        save_calibration(calibration)
+
+    env = Environment(points, indices, servo, sensor, min_confidence=MIN_CONFIDENCE,
+                      spreads=[entry[3] for entry in calibration] if SPREAD_CHECK else None,
+                      lut_path="colors.lut")
+    agent = QLearningAgent(env, epsilon=0.1) # OR SarsaAgent(env, epsilon=0.1), QLambdaAgent(env, epsilon=0.1, lambda_=0.8),
+                                             #    DynaQAgent(env, epsilon=0.1, planning_steps=10)
+
+    # pick up the Q-table saved after the last finished episode (same colors only);
+    # if that session already ran all its episodes, start a new session from its Q-table
+    episodes_done = 0
+    saved = load_checkpoint(agent, points) if RESUME else None
+    if saved and saved[0] < EPISODES:
+        episodes_done = saved[0]
+        log.log(INFO, "Resuming -- episodes done", episodes_done)
+        log.log(INFO, "Q-table", agent.format_qtable())
+    elif saved:
+        log.log(INFO, "Last session finished -- new session from its Q-table")
+        log.log(INFO, "Q-table", agent.format_qtable())
+    else:
+        clear_checkpoint()
+    log.flush()
+
+    def episode_end(runner):
+        save_checkpoint(agent, points, runner.episode + 1)
         resetflags()
 
+    # run the episodes -- the runner does a little work per tick, so the loop can
+    # sleep while it waits for the start button or for the servo
+    runner = EpisodeRunner(env, agent, episodes=EPISODES, max_steps=MAX_STEPS,
+                           ready=lambda: flags[0], on_episode_end=episode_end,
+                           start_episode=episodes_done)
+    while runner.tick():
+        handle_events()
+        if runner.waiting:
+            flashlog.service()
+            time.sleep_ms(10)
+    flashlog.flush()
+    log.flush()
+
 if __name__ == "__main__":
     main()
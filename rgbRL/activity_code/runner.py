@@ -0,0 +1,115 @@
+"""
+File: runner.py
+Purpose: Runs the training episodes as a state machine that advances a little on every tick,
+         so the main loop can sleep and handle the buttons and display instead of blocking
+         while it waits for the start button or for the servo to settle
+*** For Engineering with Artificial Intelligence Pre-College Program at Tufts University ***
+"""
+
+import time
+from logger import log, INFO, DEBUG
+
+# runner states
+WAIT_START = 0  # waiting for the start button
+PAUSE = 1       # short pause after the button before moving
+RESETTING = 2   # servo moving to the start state
+CHOOSE = 3      # choose an action and start the move
+STEPPING = 4    # servo moving for the chosen action
+FINISHED = 5
+
+class EpisodeRunner:
+    # ready: function returning True when the episode may start (e.g. the start button)
+    # on_episode_end: called with the runner after each episode (e.g. to reset the flags)
+    # start_delay: ms between the start button and the first move
+    # start_episode: episodes already done (when resuming from a checkpoint)
+    def __init__(self, env, agent, episodes=5, max_steps=15, ready=None, on_episode_end=None,
+                 start_delay=1000, start_episode=0):
+        self.env = env
+        self.agent = agent
+        self.episodes = episodes
+        self.max_steps = max_steps
+        self.ready = ready
+        self.on_episode_end = on_episode_end
+        self.start_delay = start_delay
+        self.episode = start_episode
+        self.state = None
+        self.reward_total = 0
+        self.step_count = 0
+        self.waiting = False    # True when the last tick only waited (nothing to do yet)
+        if self.episode >= self.episodes:
+            self.phase = FINISHED
+        else:
+            self._begin_wait()
+
+    def _begin_wait(self):
+        log.log(INFO, f"EPISODE {self.episode}", "Move to START state")
+        log.flush()
+        self.phase = WAIT_START
+
+    @property
+    def finished(self):
+        return self.phase == FINISHED
+
+    # Do the next piece of work, if any. Each tick returns quickly: at most a few
+    # sensor readings and one servo command. Returns False once all episodes are done.
+    def tick(self):
+        env = self.env
+        phase = self.phase
+        self.waiting = False
+        if phase == WAIT_START:
+            if self.ready is None or self.ready():
+                self._pause_start = time.ticks_ms()
+                self.phase = PAUSE
+            else:
+                self.waiting = True
+        elif phase == PAUSE:
+            if time.ticks_diff(time.ticks_ms(), self._pause_start) >= self.start_delay:
+                env.begin_reset()
+                self.phase = RESETTING
+            else:
+                self.waiting = True
+        elif phase == RESETTING:
+            if env.poll_settle():
+                self.state = env.finish_reset()
+                self.agent.start_episode()
+                self.reward_total, self.step_count = 0, 0
+                self.phase = CHOOSE
+            else:
+                self.waiting = True
+        elif phase == CHOOSE:
+            log.log(DEBUG, "TIMESTEP", self.step_count)
+            env.move(self.agent.choose_action(self.state))
+            self.phase = STEPPING
+        elif phase == STEPPING:
+            if env.poll_settle():
+                next_state, reward, done = env.finish_step()
+                self.agent.learn(reward, next_state)
+                self.state = next_state
+                self.reward_total += reward
+                self.step_count += 1
+                if done:
+                    log.log(INFO, "Goal reached!")
+                if done or self.step_count >= self.max_steps:
+                    self._end_episode()
+                else:
+                    self.phase = CHOOSE
+            else:
+                self.waiting = True
+        return self.phase != FINISHED
+
+    def _end_episode(self):
+        # print the episode summary now that the servo is idle
+        log.log(INFO, f"EPISODE {self.episode}", "reward", self.reward_total, "steps", self.step_count)
+        log.log(INFO, "Q-table", self.agent.format_qtable())
+        log.flush()
+
+        # reset angle of servo after each episode
+        self.env.servo.write_angle(self.env.angle)
+        self.env.reset_cur_angle(self.env.angle)
+        if self.on_episode_end is not None:
+            self.on_episode_end(self)
+        self.episode += 1
+        if self.episode >= self.episodes:
+            self.phase = FINISHED
+        else:
+            self._begin_wait()
@@ -33,10 +33,39 @@ _WEN = 0x08
 _AEN = 0x02
 _PON = 0x01
 
+_WLONG = 0x02       # CONFIG: wait times 12x longer
+_AVALID = 0x01      # STATUS: a measurement has completed
+_AINT = 0x10        # STATUS: RGBC interrupt (set after each new measurement when PERS is 0)
+_INT_CLEAR = 0x66   # special function: clear the RGBC interrupt
+
 _GAINS = (1, 4, 16, 60)
 
+# rgb color correction (see GroveI2cColorSensorV2.rgb)
+# empirically tuned values to correct red/blue/green overlap (cross-talk), row by row
+_CROSSTALK = (1.1, -0.05, -0.05,
+              -0.02, 1.0, -0.02,
+              -0.03, -0.03, 1.2)
+_STRETCH = 1.6  # contrast stretch around the middle of the 0-255 range
+
+# cross-talk matrix times scale to 0-255, brightness boost and contrast stretch, in
+# fixed point: applied to channel/clear with 12 fractional bits, 16 fractional bits out
+def _rgb_matrix(boost):
+    scale = _STRETCH * 255 * boost * 16
+    return tuple(int(round(m * scale)) for m in _CROSSTALK)
+
+_RGB_DIM = _rgb_matrix(1.7)     # clear < 1000 at the default exposure
+_RGB_MID = _rgb_matrix(1.4)     # clear < 3000 at the default exposure
+_RGB_BRIGHT = _rgb_matrix(1.2)
+# contrast stretch offset: (x - 127.5) * 1.6 + 127.5 = 1.6 * x - 76.5
+_RGB_OFFSET = int(127.5 * (_STRETCH - 1) * 65536)
+
+# exposure (gain x integration steps) the boost bands were tuned at: gain 4, 24 ms (10 steps)
+_DEFAULT_EXPOSURE = 4 * 10
+_COUNTS_PER_STEP = 1024     # clear channel full scale per integration step (max 65535)
+
 class GroveI2cColorSensorV2:
-    def __init__(self, bus=None, address=0x29, scl_pin=7, sda_pin=6):
+    def __init__(self, bus=None, address=0x29, scl_pin=7, sda_pin=6,
+                 integration_time=24, gain=4, auto_exposure=False):
         self.address = address
         if bus is None:
             self.i2c = SoftI2C(scl=Pin(scl_pin), sda=Pin(sda_pin), freq=100000)
@@ -44,26 +73,52 @@ class GroveI2cColorSensorV2:
             self.i2c = bus
 
         self.awake = False
+        # preallocated buffers: one register byte, and CDATA..BDATA (4 little-endian words)
+        self._byte = bytearray(1)
+        self._data = bytearray(8)
+
+        # free-running mode (see start_free_running)
+        self.free_running = False
+        self.fresh = True       # whether the last raw reading was a new measurement
+        self._last = None
+        self._restart_time = time.ticks_ms()    # start of the measurement in progress
+        self._int_pin = None
+        self._int_flag = False
 
         if self.id not in (0x44, 0x4D):
             raise ValueError('Not find a Grove I2C Color Sensor V2')
 
-        self.set_integration_time(24)
-        self.set_gain(4)
+        # copies of the ENABLE, ATIME and CONTROL registers, updated on every write,
+        # so reading settings and toggling power need no bus traffic
+        self._enable = self._read_byte(_ENABLE)
+        self._atime = 0
+        self._control = 0
+        # clear levels where rgb switches boost band, scaled to the current exposure
+        self._dim_below = 1000
+        self._mid_below = 3000
+
+        self.auto_exposure = False
+        self.set_integration_time(integration_time)
+        self.set_gain(gain)
+        if auto_exposure:
+            self.enable_auto_exposure()
+
+    def _set_enable(self, enable):
+        self._enable = enable
+        self._write_byte(_ENABLE, enable)
 
     def wakeup(self):
-        enable = self._read_byte(_ENABLE)
-        self._write_byte(_ENABLE, enable | _PON | _AEN)
+        self._set_enable(self._enable | _PON | _AEN)
         time.sleep(0.0024)
+        self._restart_time = time.ticks_ms()
         self.awake = True
 
     def sleep(self):
-        enable = self._read_byte(_ENABLE)
-        self._write_byte(_ENABLE, enable & ~_PON)
+        self._set_enable(self._enable & ~_PON)
         self.awake = False
 
     def is_awake(self):
-        return self._read_byte(_ENABLE) & _PON
+        return self._enable & _PON
 
     @property
     def id(self):
@@ -71,32 +126,200 @@ class GroveI2cColorSensorV2:
 
     @property
     def integration_time(self):
-        steps = 256 - self._read_byte(_ATIME)
+        steps = 256 - self._atime
         return steps * 2.4
 
     def set_integration_time(self, t):
         t = max(2.4, min(t, 614.4))
         steps = int(t / 2.4)
         self._integration_time = steps * 2.4
-        self._write_byte(_ATIME, 256 - steps)
+        self._atime = 256 - steps
+        self._write_byte(_ATIME, self._atime)
+        self._update_bands()
 
     @property
     def gain(self):
-        return _GAINS[self._read_byte(_CONTROL)]
+        return _GAINS[self._control & 0x03]
 
     def set_gain(self, gain):
         if gain in _GAINS:
-            self._write_byte(_CONTROL, _GAINS.index(gain))
+            self._control = _GAINS.index(gain)
+            self._write_byte(_CONTROL, self._control)
+            self._update_bands()
+
+    # gain x integration steps: the clear count of a scene is proportional to it
+    @property
+    def exposure(self):
+        return self.gain * (256 - self._atime)
+
+    def _update_bands(self):
+        exposure = self.exposure
+        self._dim_below = 1000 * exposure // _DEFAULT_EXPOSURE
+        self._mid_below = 3000 * exposure // _DEFAULT_EXPOSURE
+
+    # Automatic exposure: after each new measurement, if the clear channel is outside
+    # 2/3..3/2 of target (or saturated), pick the gain and integration time that bring it
+    # back to about target counts. The integration time is kept as short as possible:
+    # the highest gain is used whose integration time is still long enough for the
+    # clear channel's full scale to hold 2 * target. Shorter integration means each
+    # reading (and so each step of the activity) takes less time.
+    def enable_auto_exposure(self, target=2000):
+        self.auto_exposure = True
+        self.ae_target = target
+        # shortest integration (in 2.4 ms steps) whose full scale fits 2 * target
+        self._ae_min_steps = max(1, min(256, -(-2 * target // _COUNTS_PER_STEP)))
+
+    def disable_auto_exposure(self):
+        self.auto_exposure = False
+
+    def _adjust_exposure(self, clear):
+        target = self.ae_target
+        steps = 256 - self._atime
+        saturated = clear >= min(65535, steps * _COUNTS_PER_STEP) * 9 // 10
+        exposure = self.exposure
+        if saturated:
+            # the count says nothing about how bright it really is: step down fast
+            wanted = exposure // 4
+        elif 2 * target <= 3 * clear and 2 * clear <= 3 * target:
+            # close enough to target: keep the exposure (and, normally, the settings)
+            wanted = exposure
+        else:
+            wanted = exposure * target // max(clear, 1)
+        wanted = max(1, min(wanted, 60 * 256))
+        for gain in (60, 16, 4, 1):
+            if wanted >= gain * self._ae_min_steps:
+                break
+        steps = max(1, min(256, (wanted + gain // 2) // gain))
+        if gain == self.gain and steps == 256 - self._atime:
+            return False
+        self._control = _GAINS.index(gain)
+        self._write_byte(_CONTROL, self._control)
+        self._atime = 256 - steps
+        self._integration_time = steps * 2.4
+        self._write_byte(_ATIME, self._atime)
+        self._update_bands()
+        # restart the measurement so the next reading uses only the new settings
+        self._restart()
+        if self.free_running:
+            self._clear_interrupt()
+            self._int_flag = False
+        return True
+
+    # Restart the RGBC cycle. This clears AVALID, so the next valid data was
+    # integrated entirely after this call.
+    def _restart(self):
+        self._write_byte(_ENABLE, self._enable & ~_AEN)
+        self._write_byte(_ENABLE, self._enable)
+        self._restart_time = time.ticks_ms()
+
+    # wait between measurements in free-running mode, 2.4 - 614.4 ms (up to 7.4 s using WLONG)
+    def set_wait_time(self, t):
+        wlong = t > 614.4
+        if wlong:
+            t = t / 12
+        t = max(2.4, min(t, 614.4))
+        self._write_byte(_CONFIG, _WLONG if wlong else 0)
+        self._write_byte(_WTIME, 256 - int(t / 2.4))
+
+    # clear channel interrupt thresholds -- with persistence > 0 the interrupt only fires
+    # when the clear channel stays outside low..high for that many measurements
+    def set_thresholds(self, low, high):
+        self._write_word(_AILT, low)
+        self._write_word(_AIHT, high)
+
+    # persistence register value: 0 = interrupt after every measurement,
+    # 1-3 = after 1-3 out-of-threshold measurements, 4-15 = after 5, 10, ... 60
+    def set_persistence(self, persistence):
+        self._write_byte(_PERS, persistence & 0x0F)
+
+    # Let the sensor measure continuously (one measurement every integration time plus
+    # wait_time ms) with the RGBC interrupt flagging each new measurement. raw then only
+    # reads the data registers when there is a new measurement and otherwise returns the
+    # previous one straight away (fresh tells which). If the sensor's INT output is wired
+    # to a pin, pass it as int_pin so new data is noticed without polling STATUS.
+    def start_free_running(self, wait_time=0, persistence=0, int_pin=None):
+        enable = _PON | _AEN | _AIEN
+        if wait_time:
+            self.set_wait_time(wait_time)
+            enable |= _WEN
+        self.set_persistence(persistence)
+        self._set_enable(enable)
+        self._clear_interrupt()
+        self._int_pin = int_pin
+        self._int_flag = False
+        if int_pin is not None:
+            # INT is active low
+            int_pin.irq(handler=self._on_interrupt, trigger=Pin.IRQ_FALLING)
+        self.free_running = True
+        self.awake = True
+
+    def stop_free_running(self):
+        if self._int_pin is not None:
+            self._int_pin.irq(handler=None)
+            self._int_pin = None
+        self._set_enable(_PON | _AEN)
+        self._clear_interrupt()
+        self.free_running = False
+        self._last = None
+        self.fresh = True
+
+    def _on_interrupt(self, pin):
+        self._int_flag = True
+
+    def _clear_interrupt(self):
+        self._byte[0] = _CMD | 0x60 | (_INT_CLEAR & 0x1F)
+        self.i2c.writeto(self.address, self._byte)
+
+    def _new_data(self):
+        if self._int_pin is not None:
+            return self._int_flag
+        return self._read_byte(_STATUS) & _AINT
 
     @property
     def raw(self):
+        if self.free_running:
+            if self._last is not None and not self._new_data():
+                self.fresh = False
+                return self._last
+            while self._last is None and not self._new_data():
+                time.sleep(0.0024)
+            self._int_flag = False
+            self._last = self._read_data()
+            self._clear_interrupt()
+            self.fresh = True
+            if self.auto_exposure:
+                self._adjust_exposure(self._last[3])
+            return self._last
         if not self.awake:
             self.wakeup()
-        while not self._valid():
-            time.sleep(0.0024)
-        return tuple(self._read_word(reg) for reg in (_RDATA, _GDATA, _BDATA, _CDATA))
+        if self._last is None:
+            while not self._valid():
+                time.sleep(0.0024)
+        elif (time.ticks_diff(time.ticks_ms(), self._restart_time) < self._integration_time
+              or not self._valid()):
+            # AVALID stays set once a measurement is done and the data registers keep
+            # the last one, so reading again before the next measurement would only
+            # return the same data: keep the previous reading instead (fresh tells which)
+            self.fresh = False
+            return self._last
+        self._last = self._read_data()
+        self.fresh = True
+        # start a new measurement, so the next fresh reading is integrated after this one
+        if not (self.auto_exposure and self._adjust_exposure(self._last[3])):
+            self._restart()
+        return self._last
+
+    # one auto-increment read of all 8 data bytes: clear, red, green, blue
+    def _read_data(self):
+        self.i2c.readfrom_mem_into(self.address, _CMD | _AUTO | _CDATA, self._data)
+        d = self._data
+        return d[2] | d[3] << 8, d[4] | d[5] << 8, d[6] | d[7] << 8, d[0] | d[1] << 8
     
     # actual color sensing code -- still a bit wonky (refer to spreadsheet to see outputted values)
+    # Each channel is normalized to the clear channel, scaled to 0-255 with a brightness
+    # boost for dim scenes, corrected for red/green/blue cross-talk, contrast stretched
+    # and clipped. All of those steps are folded into one integer matrix per boost band
+    # (_RGB_DIM/_RGB_MID/_RGB_BRIGHT), so a reading takes a few integer operations.
     @property
     def rgb(self):
         r, g, b, clear = self.raw
@@ -104,52 +327,32 @@ class GroveI2cColorSensorV2:
         if clear == 0:
             return 0, 0, 0
 
-        # normalize relative to clear val
-        norm_r = r / clear
-        norm_g = g / clear
-        norm_b = b / clear
-
-        # scale to 0–255 space (with dynamic brightness boost)
-        # boost based on how dim the scene is
-        brightness_base = 255
-        boost = 1.7 if clear < 1000 else 1.4 if clear < 3000 else 1.2
+        # normalize relative to clear val (12-bit fixed point)
+        r = (r << 12) // clear
+        g = (g << 12) // clear
+        b = (b << 12) // clear
 
-        r = norm_r * brightness_base * boost
-        g = norm_g * brightness_base * boost
-        b = norm_b * brightness_base * boost
+        # boost based on how dim the scene is (band limits follow the exposure, so
+        # the same scene gets the same boost whatever the gain and integration time)
+        k = _RGB_DIM if clear < self._dim_below else _RGB_MID if clear < self._mid_below else _RGB_BRIGHT
 
-        # apply per-channel correction matrix
-        # empirically tuned values to correct red/blue/green overlap (cross-talk)
-        corrected_r = 1.1 * r - 0.05 * g - 0.05 * b
-        corrected_g = -0.02 * r + 1.0 * g - 0.02 * b
-        corrected_b = -0.03 * r - 0.03 * g + 1.2 * b
-
-        r = corrected_r
-        g = corrected_g
-        b = corrected_b
-
-        # stretch contrast toward vivid range
-        def stretch(channel, factor=1.6):
-            mid = 127.5
-            return (channel - mid) * factor + mid
-
-        r = stretch(r)
-        g = stretch(g)
-        b = stretch(b)
+        red = (k[0] * r + k[1] * g + k[2] * b - _RGB_OFFSET) >> 16
+        green = (k[3] * r + k[4] * g + k[5] * b - _RGB_OFFSET) >> 16
+        blue = (k[6] * r + k[7] * g + k[8] * b - _RGB_OFFSET) >> 16
 
         # clip to valid range
-        r = int(min(255, max(0, r)))
-        g = int(min(255, max(0, g)))
-        b = int(min(255, max(0, b)))
+        red = 0 if red < 0 else 255 if red > 255 else red
+        green = 0 if green < 0 else 255 if green > 255 else green
+        blue = 0 if blue < 0 else 255 if blue > 255 else blue
 
-        return r, g, b
+        return red, green, blue
 
     def _valid(self):
         return self._read_byte(_STATUS) & 0x01
 
     def _read_byte(self, address):
-        self.i2c.writeto(self.address, bytes([_CMD | address]))
-        return self.i2c.readfrom(self.address, 1)[0]
+        self.i2c.readfrom_mem_into(self.address, _CMD | address, self._byte)
+        return self._byte[0]
 
     def _read_word(self, address):
         self.i2c.writeto(self.address, bytes([_CMD | _AUTO | address]))
@@ -158,3 +361,6 @@ class GroveI2cColorSensorV2:
 
     def _write_byte(self, address, data):
         self.i2c.writeto(self.address, bytes([_CMD | address, data]))
+
+    def _write_word(self, address, data):
+        self.i2c.writeto(self.address, bytes([_CMD | _AUTO | address, data & 0xFF, (data >> 8) & 0xFF]))
@@ -0,0 +1,186 @@
+"""
+File: sim.py
+Purpose: Simulated color strip, servo and color sensor for running the activity on a computer
+         (no Smart Motor needed) -- use it to try out alpha, gamma and epsilon over many episodes
+         before going to hardware
+*** For Engineering with Artificial Intelligence Pre-College Program at Tufts University ***
+
+Run with regular Python from this folder, e.g.:
+    python sim.py --episodes 200 --runs 50 --alpha 0.1 --gamma 0.9 --epsilon 0.1
+"""
+
+import random
+import time
+
+from agent import QLearningAgent, SarsaAgent, QLambdaAgent, DynaQAgent
+from environment import Environment
+
+# colors of the patches on the strip, from state 0 to the goal state
+DEFAULT_STRIP = [
+    (200, 40, 40),    # red
+    (220, 120, 30),   # orange
+    (210, 200, 40),   # yellow
+    (60, 180, 60),    # green
+    (40, 170, 170),   # teal
+    (40, 70, 200),    # blue
+    (130, 50, 180),   # purple
+    (200, 80, 150),   # pink
+]
+
+# stands in for servo.Servo -- moves instantly
+class SimServo:
+    def __init__(self):
+        self.angle = 0
+
+    def write_angle(self, angle):
+        self.angle = angle
+
+# stands in for GroveI2cColorSensorV2 looking at a strip of colored patches.
+# Patch i sits at angle i * (180 // len(strip)), the same spacing Environment
+# uses. Noise model:
+#   - position_noise: servo position error in degrees (gaussian)
+#   - blend: fraction of a patch around each border where the sensor sees a
+#     mix of the two neighboring colors
+#   - color_noise: per-channel reading noise (gaussian, 0-255 scale)
+class SimColorSensor:
+    def __init__(self, strip, servo, position_noise=1.0, blend=0.2, color_noise=6.0,
+                 clear_scale=4, rng=None):
+        self.strip = strip
+        self.servo = servo
+        self.step_angle = 180 // len(strip)
+        self.position_noise = position_noise
+        self.blend = blend
+        self.color_noise = color_noise
+        self.clear_scale = clear_scale
+        self.rng = rng or random.Random()
+
+    def _sample(self):
+        rng = self.rng
+        pos = (self.servo.angle + rng.gauss(0, self.position_noise)) / self.step_angle
+        last = len(self.strip) - 1
+        pos = min(max(pos, 0.0), float(last))
+        i = int(pos)
+        color = self.strip[i]
+        if i < last and self.blend > 0:
+            # weight of the next patch: 0 until the border region, then ramps to 1
+            w = (pos - i - 0.5) / self.blend + 0.5
+            if w > 0:
+                w = min(w, 1.0)
+                nxt = self.strip[i + 1]
+                color = [c + (n - c) * w for c, n in zip(color, nxt)]
+        return [min(255.0, max(0.0, c + rng.gauss(0, self.color_noise))) for c in color]
+
+    @property
+    def raw(self):
+        r, g, b = self._sample()
+        k = self.clear_scale
+        return int(r * k), int(g * k), int(b * k), int((r + g + b) * k)
+
+    @property
+    def rgb(self):
+        r, g, b = self._sample()
+        return int(r), int(g), int(b)
+
+# Environment with the same interface (reset, step, states, goal_state), backed by the
+# simulated strip. Colors are captured the same way main() does: one reading per patch.
+# lut_bits defaults to None (search all colors): building the lookup table takes far
+# longer than a few simulated episodes.
+class SimEnvironment(Environment):
+    def __init__(self, strip=DEFAULT_STRIP, position_noise=1.0, blend=0.2, color_noise=6.0, seed=None,
+                 lut_bits=None, min_confidence=None):
+        rng = random.Random(seed)
+        servo = SimServo()
+        sensor = SimColorSensor(strip, servo, position_noise, blend, color_noise, rng=rng)
+        points = []
+        for i in range(len(strip)):
+            servo.write_angle(i * sensor.step_angle)
+            points.append(list(sensor.rgb))
+        super().__init__(points, list(range(len(strip))), servo, sensor, lut_bits, min_confidence)
+
+    # the simulated servo moves instantly
+    def settle(self):
+        pass
+
+    def begin_settle(self):
+        pass
+
+    def poll_settle(self):
+        return True
+
+# run episodes the same way main() does; returns the steps and total reward of each episode
+def train(env, agent, episodes=5, max_steps=15):
+    steps_history = []
+    reward_history = []
+    for ep in range(episodes):
+        state = env.reset()
+        agent.start_episode()
+        reward_total, step_count = 0, 0
+        for t in range(max_steps):
+            action = agent.choose_action(state)
+            next_state, reward, done = env.step(action)
+            agent.learn(reward, next_state)
+            state = next_state
+            reward_total += reward
+            step_count += 1
+            if done:
+                break
+        env.servo.write_angle(env.angle)
+        env.reset_cur_angle(env.angle)
+        steps_history.append(step_count)
+        reward_history.append(reward_total)
+    return steps_history, reward_history
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Simulated RGB reinforcement learning activity")
+    parser.add_argument("--episodes", type=int, default=5)
+    parser.add_argument("--steps", type=int, default=15, help="max steps per episode")
+    parser.add_argument("--runs", type=int, default=100, help="independent runs to average over")
+    parser.add_argument("--agent", choices=("q", "sarsa", "qlambda", "dyna"), default="q",
+                        help="Q-learning, SARSA, Q(lambda) with eligibility traces or Dyna-Q")
+    parser.add_argument("--alpha", type=float, default=0.1)
+    parser.add_argument("--gamma", type=float, default=0.9)
+    parser.add_argument("--epsilon", type=float, default=0.1)
+    parser.add_argument("--lambda", dest="lambda_", type=float, default=0.8, help="trace decay for qlambda")
+    parser.add_argument("--planning", type=int, default=10, help="simulated updates per step for dyna")
+    parser.add_argument("--color-noise", type=float, default=6.0)
+    parser.add_argument("--position-noise", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--lut", action="store_true",
+                        help="classify colors with the lookup table like the Smart Motor (rebuilt every run, much slower)")
+    parser.add_argument("--min-confidence", type=float, default=None,
+                        help="re-sample color readings below this confidence (0-1)")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    steps_sum = [0] * args.episodes
+    reward_sum = [0] * args.episodes
+    start = time.perf_counter()
+    for run in range(args.runs):
+        env = SimEnvironment(color_noise=args.color_noise, position_noise=args.position_noise,
+                             seed=None if args.seed is None else args.seed + run,
+                             lut_bits=5 if args.lut else None, min_confidence=args.min_confidence)
+        if args.agent == "qlambda":
+            agent = QLambdaAgent(env, alpha=args.alpha, gamma=args.gamma, epsilon=args.epsilon,
+                                 lambda_=args.lambda_)
+        elif args.agent == "dyna":
+            agent = DynaQAgent(env, alpha=args.alpha, gamma=args.gamma, epsilon=args.epsilon,
+                               planning_steps=args.planning)
+        else:
+            agent_class = SarsaAgent if args.agent == "sarsa" else QLearningAgent
+            agent = agent_class(env, alpha=args.alpha, gamma=args.gamma, epsilon=args.epsilon)
+        steps, rewards = train(env, agent, args.episodes, args.steps)
+        for ep in range(args.episodes):
+            steps_sum[ep] += steps[ep]
+            reward_sum[ep] += rewards[ep]
+    elapsed = time.perf_counter() - start
+
+    print("episode  avg steps  avg reward")
+    for ep in range(args.episodes):
+        print("%7d  %9.2f  %10.2f" % (ep, steps_sum[ep] / args.runs, reward_sum[ep] / args.runs))
+    total = args.runs * args.episodes
+    print("%d episodes in %.2f s (%.0f episodes/s)" % (total, elapsed, total / elapsed))
+
+if __name__ == "__main__":
+    main()
@@ -21,7 +21,6 @@ def displayselect(display, selectedIcon):
 def uppressed(display, count=1):
     from state import playFlag, triggered
     playFlag = False
-    time.sleep(0.05)
     if time.ticks_ms() - lastPressed > 200:
         displayselect(display, count)
     triggered = True
@@ -30,7 +29,6 @@ def uppressed(display, count=1):
 def downpressed(display, count=-1):
     from state import playFlag, triggered
     playFlag = False
-    time.sleep(0.05)
     if time.ticks_ms() - lastPressed > 200:
         displayselect(display, count)
     triggered = True
@@ -38,7 +36,6 @@ def downpressed(display, count=-1):
 # Handle select button press
 def selectpressed():
     from state import triggered
-    time.sleep(0.05)
     flags[highlightedIcon[screenID][0]] = True
     triggered = True
 